@@ -2,10 +2,9 @@ from container.repositories import RepositoryContainer
 from interfaces.clients.ia_interface import IAI
 from container.clients import ClientContainer
 from typing import List, Dict, Any, Optional
-from openai.types.chat import ChatCompletion
+from interfaces.agent.agent_interface import ReplyStream
 from agents.agent_base import BaseAgent 
 from utils.logger import logger
-import json
 
 from interfaces.clients.calendar_inteface import ICalendar 
 
@@ -13,7 +12,13 @@ from interfaces.clients.calendar_inteface import ICalendar
 class AgentAgendamento(BaseAgent):
 #--------------------------------------------------------------------------------------------------------------------#
 
+    sticky = True
+    _FLOW_COMPLETING_TOOLS = frozenset({"create_calendar_event", "update_calendar_event", "delete_calendar_event"})
+    _SEQUENTIAL_TOOLS = _FLOW_COMPLETING_TOOLS
+    error_reply = "Desculpe, o Agente de Agendamento encontrou um problema."
+
     def __init__(self, ai_client: IAI, calendar_client: ICalendar): 
+        super().__init__()
         self._ai_client = ai_client
         self._calendar_client = calendar_client 
         logger.info(f"[AgentAgendamento] Agente {self.id} inicializado com GCalendarClient.")
@@ -99,84 +104,44 @@ class AgentAgendamento(BaseAgent):
 #--------------------------------------------------------------------------------------------------------------------#
 
 
-    async def exec(self, context: List[Dict[str, Any]], phone: str) -> List[Dict[str, Any]]:
+    async def exec(self, context: List[Dict[str, Any]], phone: str, reply_stream: Optional[ReplyStream] = None) -> List[Dict[str, Any]]:
         logger.info(f"[{self.id}] Executando agente para {phone}.")
         messages = self._insert_system_input(context)
         try:
-            response_completion: ChatCompletion = await self._ai_client.create_model_response(
-                model=self.model,
-                input_messages=messages,
-                tools=self.tools,
-            )
-            response_message = response_completion.choices[0].message
-            messages.append(self._message_to_dict(response_message))            
-            
-            while response_message.tool_calls:
-                logger.info(f"[{self.id}] Acionando ferramentas: {[tc.function.name for tc in response_message.tool_calls]}")
-                
-                for tool_call in response_message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    tool_output = ""
-                    try:
-                        if function_name == "get_calendar_events":
-                            tool_output = await self._calendar_client.get_events(
-                                start_date=function_args.get("start_date"),
-                                end_date=function_args.get("end_date")
-                            )
-                            logger.info(f"[{self.id}] Ferramenta 'get_calendar_events' chamada.")
-                        
-                        elif function_name == "create_calendar_event":
-                            tool_output = await self._calendar_client.create_event(
-                                summary=function_args.get("summary"),
-                                start_time=function_args.get("start_time"),
-                                end_time=function_args.get("end_time")
-                            )
-                            logger.info(f"[{self.id}] Ferramenta 'create_calendar_event' chamada.")
-                        
-                        elif function_name == "update_calendar_event":
-                            event_id = function_args.get("event_id")
-                            update_body = function_args.get("update_body")
-                            tool_output = await self._calendar_client.update_event(event_id, update_body)
-                            logger.info(f"[{self.id}] Ferramenta 'update_calendar_event' chamada para ID: {event_id}")
-
-                        elif function_name == "delete_calendar_event":
-                            event_id = function_args.get("event_id")
-                            tool_output = await self._calendar_client.delete_event(event_id)
-                            logger.info(f"[{self.id}] Ferramenta 'delete_calendar_event' chamada para ID: {event_id}")
-                            
-                        else:
-                            tool_output = f"Erro: Ferramenta '{function_name}' desconhecida."
-                            logger.warning(f"[{self.id}] Tentativa de chamar ferramenta desconhecida: {function_name}")
-                    
-                    except Exception as tool_e:
-                        logger.error(f"[{self.id}] Erro ao executar ferramenta '{function_name}': {tool_e}", exc_info=True)
-                        tool_output = f"Erro ao executar a ferramenta {function_name}: {str(tool_e)}"
-                    
-                    messages.append(
-                        {
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": json.dumps(tool_output, default=str),
-                        }
-                    )
-                
-                logger.info(f"[{self.id}] Enviando resultados das ferramentas de volta para a IA.")
-                response_completion: ChatCompletion = await self._ai_client.create_model_response(
-                    model=self.model,
-                    input_messages=messages,
-                    tools=self.tools,
-                )
-                response_message = response_completion.choices[0].message
-                messages.append(self._message_to_dict(response_message))
-                
+            response_message = await self._run_tool_loop(messages)
             final_content = response_message.content or "OK."
             logger.info(f"[{self.id}] Resposta final gerada: {final_content[:50]}...")
             return messages
             
         except Exception as e:
             logger.error(f"[{self.id}] Erro ao executar: {e}", exc_info=True)
-            return messages + [{"role": "assistant", "content": "Desculpe, o Agente de Agendamento encontrou um problema."}]
+            return messages + [{"role": "assistant", "content": self.error_reply}]
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _call_tool(self, function_name: str, function_args: Dict[str, Any]) -> Any:
+        if function_name == "get_calendar_events":
+            logger.info(f"[{self.id}] Ferramenta 'get_calendar_events' chamada.")
+            return await self._calendar_client.get_events(
+                start_date=function_args.get("start_date"),
+                end_date=function_args.get("end_date")
+            )
+        if function_name == "create_calendar_event":
+            logger.info(f"[{self.id}] Ferramenta 'create_calendar_event' chamada.")
+            return await self._calendar_client.create_event(
+                summary=function_args.get("summary"),
+                start_time=function_args.get("start_time"),
+                end_time=function_args.get("end_time")
+            )
+        if function_name == "update_calendar_event":
+            event_id = function_args.get("event_id")
+            logger.info(f"[{self.id}] Ferramenta 'update_calendar_event' chamada para ID: {event_id}")
+            return await self._calendar_client.update_event(event_id, function_args.get("update_body"))
+        if function_name == "delete_calendar_event":
+            event_id = function_args.get("event_id")
+            logger.info(f"[{self.id}] Ferramenta 'delete_calendar_event' chamada para ID: {event_id}")
+            return await self._calendar_client.delete_event(event_id)
+        return await super()._call_tool(function_name, function_args)
 
 #--------------------------------------------------------------------------------------------------------------------#
 
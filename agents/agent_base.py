@@ -1,15 +1,28 @@
 from openai.types.chat import ChatCompletion, ChatCompletionMessage
-from interfaces.agent.agent_interface import IAgent
+from interfaces.agent.agent_interface import IAgent, ReplyStream
+from utils.metrics import metrics
 from utils.logger import logger
 from utils.date import ZoneInfo
+from utils import json_codec
 from abc import abstractmethod
-from typing import Any
+from typing import Any, Optional
 from datetime import datetime, timezone
+import asyncio
+import time
+import os
 
 
 
 #--------------------------------------------------------------------------------------------------------------------#
 class BaseAgent(IAgent):
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def __init__(self):
+        self.TOOL_TIMEOUT_SECONDS = float(os.getenv("AGENT_TOOL_TIMEOUT_SECONDS", "20"))
+        self.TOOL_MAX_CONCURRENCY = int(os.getenv("AGENT_TOOL_MAX_CONCURRENCY", "4"))
+        # Limite por agente, compartilhado entre turnos simultâneos.
+        self._tool_semaphore = asyncio.Semaphore(self.TOOL_MAX_CONCURRENCY)
+
 #--------------------------------------------------------------------------------------------------------------------#
 
     @property
@@ -43,11 +56,44 @@ class BaseAgent(IAgent):
 #--------------------------------------------------------------------------------------------------------------------#
 
     @abstractmethod
-    async def exec(self, context: list[dict[str, Any]], phone: str) -> list[dict[str, Any]]: ...
+    async def exec(
+        self, context: list[dict[str, Any]], phone: str, reply_stream: Optional[ReplyStream] = None
+    ) -> list[dict[str, Any]]: ...
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    # Agentes com fluxos de vários turnos (ex.: confirmar -> criar) ficam "grudados" na conversa enquanto
+    # aguardam uma resposta do usuário para um passo pendente.
+    sticky: bool = False
+    _FLOW_COMPLETING_TOOLS: frozenset[str] = frozenset()
+    error_reply: str = "Desculpe, encontrei um problema ao processar sua solicitação."
+
+    def flow_open(self, output_messages: list[dict[str, Any]]) -> bool:
+        """
+        True só quando o agente sinaliza um passo pendente: a resposta final do turno é uma pergunta ao usuário
+        (ex.: confirmação) e nenhuma ferramenta de conclusão foi chamada. Respostas de erro nunca abrem o fluxo.
+        """
+        if not self.sticky:
+            return False
+        last_user_index = max((i for i, msg in enumerate(output_messages) if msg.get("role") == "user"), default=-1)
+        turn_messages = output_messages[last_user_index + 1:]
+        for msg in turn_messages:
+            for tool_call in msg.get("tool_calls") or []:
+                if tool_call.get("function", {}).get("name") in self._FLOW_COMPLETING_TOOLS:
+                    return False
+        final_reply = next(
+            (msg.get("content") for msg in reversed(turn_messages) if msg.get("role") == "assistant" and msg.get("content")),
+            None
+        )
+        if not isinstance(final_reply, str) or final_reply == self.error_reply:
+            return False
+        return final_reply.rstrip().endswith("?")
 
 #--------------------------------------------------------------------------------------------------------------------#
 
     def _insert_system_input(self, input_list: list) -> list:
+        # A memória resumida (system, name="memory") é contexto da conversa, não prompt de outro agente.
+        memory_messages = [msg for msg in input_list if msg.get("role") == "system" and msg.get("name") == "memory"]
         filtered_list = [msg for msg in input_list if msg.get("role") != "system"]
         try:
             sao_paulo_tz = ZoneInfo("America/Sao_Paulo")
@@ -61,8 +107,83 @@ class BaseAgent(IAgent):
             CURRENT_DATETIME=current_time_str
         )
         system_prompt = {"role": "system", "content": instructions_content}
-        filtered_list.insert(0, system_prompt)
-        return filtered_list
+        return [system_prompt] + memory_messages + filtered_list
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    # Ferramentas com efeito colateral (escrita): se uma delas aparece no lote, o lote inteiro roda em ordem,
+    # e ela roda sem timeout (cancelar no meio deixaria o efeito sem resultado para o modelo).
+    _SEQUENTIAL_TOOLS: frozenset[str] = frozenset()
+
+    async def _call_tool(self, function_name: str, function_args: dict[str, Any]) -> Any:
+        """Executa uma ferramenta do agente. Agentes com ferramentas sobrescrevem este método."""
+        logger.warning(f"[{self.id}] Tentativa de chamar ferramenta desconhecida: {function_name}")
+        return f"Erro: Ferramenta '{function_name}' desconhecida."
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _run_tool_loop(self, messages: list[dict[str, Any]]) -> ChatCompletionMessage:
+        """
+        Loop de ferramentas compartilhado: chama o modelo, executa os tool_calls da mensagem (leituras em paralelo,
+        com timeout e limite de concorrência; lotes com escrita em ordem), devolve os resultados e repete até a
+        resposta final.
+        `messages` é estendida no lugar; retorna a última mensagem do modelo.
+        """
+        response_completion: ChatCompletion = await self._ai_client.create_model_response(
+            model=self.model,
+            input_messages=messages,
+            tools=self.tools,
+        )
+        response_message = response_completion.choices[0].message
+        messages.append(self._message_to_dict(response_message))
+        while response_message.tool_calls:
+            logger.info(f"[{self.id}] Acionando ferramentas: {[tc.function.name for tc in response_message.tool_calls]}")
+            messages.extend(await self._execute_tool_calls(response_message.tool_calls))
+            logger.info(f"[{self.id}] Enviando resultados das ferramentas de volta para a IA.")
+            response_completion = await self._ai_client.create_model_response(
+                model=self.model,
+                input_messages=messages,
+                tools=self.tools,
+            )
+            response_message = response_completion.choices[0].message
+            messages.append(self._message_to_dict(response_message))
+        return response_message
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _execute_tool_calls(self, tool_calls: list) -> list[dict[str, Any]]:
+        if any(tool_call.function.name in self._SEQUENTIAL_TOOLS for tool_call in tool_calls):
+            # Ex.: "consultar e depois criar": a leitura não pode correr em paralelo com a escrita.
+            return [await self._execute_tool_call(tool_call) for tool_call in tool_calls]
+        # gather preserva a ordem de entrada: os resultados saem na ordem dos tool_calls.
+        return list(await asyncio.gather(*(self._execute_tool_call(tool_call) for tool_call in tool_calls)))
+
+    async def _execute_tool_call(self, tool_call: Any) -> dict[str, Any]:
+        function_name = tool_call.function.name
+        started = time.monotonic()
+        try:
+            function_args = json_codec.loads(tool_call.function.arguments or "{}")
+            async with self._tool_semaphore:
+                if function_name in self._SEQUENTIAL_TOOLS:
+                    tool_output = await self._call_tool(function_name, function_args)
+                else:
+                    tool_output = await asyncio.wait_for(
+                        self._call_tool(function_name, function_args), self.TOOL_TIMEOUT_SECONDS
+                    )
+        except asyncio.TimeoutError:
+            metrics.increment(f"agent_tool.timeout.{function_name}")
+            logger.error(f"[{self.id}] Ferramenta '{function_name}' excedeu {self.TOOL_TIMEOUT_SECONDS}s.")
+            tool_output = f"Erro: a ferramenta {function_name} excedeu o tempo limite de {self.TOOL_TIMEOUT_SECONDS:g}s."
+        except Exception as tool_e:
+            metrics.increment(f"agent_tool.failed.{function_name}")
+            logger.error(f"[{self.id}] Erro ao executar ferramenta '{function_name}': {tool_e}", exc_info=True)
+            tool_output = f"Erro ao executar a ferramenta {function_name}: {str(tool_e)}"
+        metrics.observe(f"agent_tool.latency_ms.{function_name}", (time.monotonic() - started) * 1000)
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call.id,
+            "content": json_codec.dumps(tool_output, default=str),
+        }
 
 #--------------------------------------------------------------------------------------------------------------------#
 
@@ -1,17 +1,19 @@
 from typing import List, Dict, Any, Optional
-from openai.types.chat import ChatCompletion
+from interfaces.agent.agent_interface import ReplyStream
 from agents.agent_base import BaseAgent
 from interfaces.clients.ia_interface import IAI
 from container.clients import ClientContainer
 from container.repositories import RepositoryContainer
 from utils.logger import logger
-import json
 #from interfaces.clients.websearch_interface import IWebSearch
 #--------------------------------------------------------------------------------------------------------------------#
 class AgentConteudo(BaseAgent):
 #--------------------------------------------------------------------------------------------------------------------#
 
+    error_reply = "Desculpe, o Agente de Conteúdo encontrou um problema."
+
     def __init__(self, ai_client: IAI, websearch_client: Any): 
+        super().__init__()
         self._ai_client = ai_client 
         self._websearch_client = websearch_client 
         logger.info(f"Agente {self.id} inicializado.")
@@ -70,65 +72,27 @@ class AgentConteudo(BaseAgent):
 #--------------------------------------------------------------------------------------------------------------------#
 
 
-    async def exec(self, context: List[Dict[str, Any]], phone: str) -> List[Dict[str, Any]]:
+    async def exec(self, context: List[Dict[str, Any]], phone: str, reply_stream: Optional[ReplyStream] = None) -> List[Dict[str, Any]]:
         logger.info(f"[{self.id}] Executando agente para {phone}.")
         messages = self._insert_system_input(context)
         try:
-            response_completion: ChatCompletion = await self._ai_client.create_model_response(
-                model=self.model,
-                input_messages=messages,
-                tools=self.tools,
-            )
-            response_message = response_completion.choices[0].message
-            messages.append(self._message_to_dict(response_message))
-
-            while response_message.tool_calls:
-                logger.info(f"[{self.id}] Acionando ferramentas: {[tc.function.name for tc in response_message.tool_calls]}")
-                
-                for tool_call in response_message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    tool_output = ""
-                    try:
-                        if function_name == "search_web":
-                            # --- LÓGICA MOCK REMOVIDA ---
-                            query = function_args.get("query")
-                            tool_output = await self._websearch_client.search(query) # <- Chamada real
-                            logger.info(f"[{self.id}] Ferramenta 'search_web' chamada com query: {query}")
-                        else:
-                            tool_output = f"Erro: Ferramenta '{function_name}' desconhecida."
-                            logger.warning(f"[{self.id}] Tentativa de chamar ferramenta desconhecida: {function_name}")
-                    
-                    except Exception as tool_e:
-                        logger.error(f"[{self.id}] Erro ao executar ferramenta '{function_name}': {tool_e}", exc_info=True)
-                        tool_output = f"Erro ao executar a ferramenta {function_name}: {str(tool_e)}"
-
-                    messages.append(
-                        {
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": json.dumps(tool_output),
-                        }
-                    )
-
-                logger.info(f"[{self.id}] Enviando resultados da web de volta para a IA.")
-                
-                # --- CORREÇÃO: Removido 'instructions=None' ---
-                response_completion: ChatCompletion = await self._ai_client.create_model_response(
-                    model=self.model,
-                    input_messages=messages,
-                    tools=self.tools,
-                )
-                response_message = response_completion.choices[0].message
-                messages.append(self._message_to_dict(response_message))
-
+            response_message = await self._run_tool_loop(messages)
             final_content = response_message.content or "Conteúdo processado."
             logger.info(f"[{self.id}] Resposta final gerada: {final_content[:50]}...")
             return messages
 
         except Exception as e:
             logger.error(f"[{self.id}] Erro ao executar: {e}", exc_info=True)
-            return messages + [{"role": "assistant", "content": "Desculpe, o Agente de Conteúdo encontrou um problema."}]
+            return messages + [{"role": "assistant", "content": self.error_reply}]
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _call_tool(self, function_name: str, function_args: Dict[str, Any]) -> Any:
+        if function_name == "search_web":
+            query = function_args.get("query")
+            logger.info(f"[{self.id}] Ferramenta 'search_web' chamada com query: {query}")
+            return await self._websearch_client.search(query)
+        return await super()._call_tool(function_name, function_args)
 
 #--------------------------------------------------------------------------------------------------------------------#
 
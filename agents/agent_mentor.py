@@ -6,6 +6,7 @@ from interfaces.clients.ia_interface import IAI
 from container.clients import ClientContainer
 from typing import List, Dict, Any, Optional
 from openai.types.chat import ChatCompletion
+from interfaces.agent.agent_interface import ReplyStream
 from agents.agent_base import BaseAgent
 from utils.logger import logger
 
@@ -14,6 +15,7 @@ class AgentMentor(BaseAgent):
 #--------------------------------------------------------------------------------------------------------------------#
 
     def __init__(self, ai_client: IAI):
+        super().__init__()
         self._ai_client = ai_client
         logger.info(f"Agente {self.id} inicializado.")
 
@@ -59,23 +61,28 @@ class AgentMentor(BaseAgent):
 
 #--------------------------------------------------------------------------------------------------------------------#
 
-    async def exec(self, context: List[Dict[str, Any]], phone: str) -> List[Dict[str, Any]]:
+    async def exec(self, context: List[Dict[str, Any]], phone: str, reply_stream: Optional[ReplyStream] = None) -> List[Dict[str, Any]]:
         logger.info(f"[{self.id}] Executando agente para {phone}.")
         messages = self._insert_system_input(context)         
         try:
-            response_completion: ChatCompletion = await self._ai_client.create_model_response(
-                model=self.model,
-                input_messages=messages,
-                tools=self.tools,
-            )
-            final_content = self._extract_text_from_completion(response_completion)            
+            if reply_stream:
+                # Sem ferramentas: a resposta pode ir para o usuário parágrafo a parágrafo.
+                streamed = await reply_stream(self._ai_client.stream_model_response(model=self.model, input_messages=messages))
+                final_content = streamed.strip()
+            else:
+                response_completion: ChatCompletion = await self._ai_client.create_model_response(
+                    model=self.model,
+                    input_messages=messages,
+                    tools=self.tools,
+                )
+                final_content = self._extract_text_from_completion(response_completion)            
             logger.info(f"[{self.id}] Resposta gerada: {final_content[:50]}...")
             output_messages = messages + [{"role": "assistant", "content": final_content}]
             return output_messages
 
         except Exception as e:
             logger.error(f"[{self.id}] Erro ao executar: {e}", exc_info=True)
-            return messages + [{"role": "assistant", "content": "Desculpe, encontrei um problema ao processar sua solicitação."}]
+            return messages + [{"role": "assistant", "content": self.error_reply}]
         
 #--------------------------------------------------------------------------------------------------------------------#
 
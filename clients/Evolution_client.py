@@ -14,6 +14,7 @@ class EvolutionClient(IChat):
         self._EVOLUTION_API_KEY = os.getenv("EVOLUTION_API_KEY") or os.getenv("evolution_token")
         self._EVOLUTION_INSTANCE = os.getenv("EVOLUTION_INSTANCE", "default")
         self._EVOLUTION_SEND_PATH = (f"{self._EVOLUTION_URL}/message/sendText/{self._EVOLUTION_INSTANCE}")
+        self._EVOLUTION_PRESENCE_PATH = (f"{self._EVOLUTION_URL}/chat/sendPresence/{self._EVOLUTION_INSTANCE}")
         if not self._EVOLUTION_URL or not self._EVOLUTION_API_KEY:
             logger.error("[EvolutionClient] EVOLUTION_URL ou EVOLUTION_API_KEY não definidos.")
             raise ValueError("Configuração da Evolution API incompleta.")
@@ -95,6 +96,24 @@ class EvolutionClient(IChat):
             return False
         
 
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def send_presence(self, phone: str, presence: str = "composing", delay_ms: int = 3000) -> bool:
+        """Mostra 'digitando...' no chat (a Evolution mantém a presença por `delay_ms`)."""
+        try:
+            payload = {
+                "number": phone,
+                "presence": presence,
+                "delay": delay_ms
+            }
+            response = await self.http_client.post(self._EVOLUTION_PRESENCE_PATH, json=payload)
+            response.raise_for_status()
+            return True
+
+        except Exception as e:
+            logger.warning(f"[EvolutionClient] Falha ao enviar presença para {phone}: {e}")
+            return False
+
 #--------------------------------------------------------------------------------------------------------------------#
 
 
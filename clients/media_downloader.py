@@ -0,0 +1,128 @@
+from exceptions.media_exceptions import MediaTooLargeError
+from contextlib import asynccontextmanager
+from utils.metrics import metrics
+from utils.logger import logger
+from typing import AsyncIterator, Optional
+import importlib.util
+import asyncio
+import random
+import httpx
+import time
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+class MediaDownloader:
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Download de mídia do CDN do WhatsApp: pool de conexões keep-alive (HTTP/2 quando disponível),
+    limite de downloads simultâneos, limite de bytes aplicado durante o stream e retentativas com
+    jitter para falhas transitórias (só antes de qualquer byte do corpo ser lido).
+    """
+
+    _RETRY_STATUS = {429, 500, 502, 503, 504}
+    _CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        self.MAX_CONCURRENCY = int(os.getenv("MEDIA_DOWNLOAD_MAX_CONCURRENCY", "8"))
+        self.MAX_BYTES = int(os.getenv("MEDIA_DOWNLOAD_MAX_BYTES", str(16 * 1024 * 1024)))
+        self.MAX_ATTEMPTS = int(os.getenv("MEDIA_DOWNLOAD_MAX_ATTEMPTS", "3"))
+        self.BACKOFF_BASE_SECONDS = float(os.getenv("MEDIA_DOWNLOAD_BACKOFF_SECONDS", "0.5"))
+        http2 = os.getenv("MEDIA_DOWNLOAD_HTTP2", "true").lower() == "true" and importlib.util.find_spec("h2") is not None
+        self.http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=self.MAX_CONCURRENCY * 2,
+                max_keepalive_connections=self.MAX_CONCURRENCY,
+                keepalive_expiry=60.0,
+            ),
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            follow_redirects=True,
+        )
+        self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+        self._in_flight = 0
+        logger.info(
+            f"[MediaDownloader] Inicializado (HTTP/2: {http2}, concorrência {self.MAX_CONCURRENCY}, "
+            f"limite {self.MAX_BYTES} bytes, {self.MAX_ATTEMPTS} tentativas)."
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @asynccontextmanager
+    async def open_stream(self, url: str, max_bytes: Optional[int] = None) -> AsyncIterator[AsyncIterator[bytes]]:
+        """Abre o download e entrega um iterador de chunks; a vaga do semáforo vale até o fim do bloco `async with`."""
+        limit = max_bytes or self.MAX_BYTES
+        async with self._semaphore:
+            self._set_in_flight(+1)
+            started = time.monotonic()
+            try:
+                response = await self._send_with_retries(url)
+                try:
+                    declared = int(response.headers.get("content-length") or 0)
+                    if declared > limit:
+                        raise MediaTooLargeError(f"Mídia declara {declared} bytes (limite {limit}).")
+                    yield self._iter_limited(response, limit, started)
+                finally:
+                    await response.aclose()
+
+            except MediaTooLargeError:
+                metrics.increment("media_download.failed.too_large")
+                raise
+            except httpx.HTTPStatusError as e:
+                metrics.increment(f"media_download.failed.http_{e.response.status_code}")
+                raise
+            except httpx.RequestError:
+                metrics.increment("media_download.failed.network")
+                raise
+            finally:
+                self._set_in_flight(-1)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _send_with_retries(self, url: str) -> httpx.Response:
+        attempt = 1
+        while True:
+            try:
+                request = self.http_client.build_request("GET", url)
+                response = await self.http_client.send(request, stream=True)
+                if response.status_code in self._RETRY_STATUS and attempt < self.MAX_ATTEMPTS:
+                    await response.aclose()
+                    reason = f"HTTP {response.status_code}"
+                else:
+                    if response.is_error:
+                        await response.aclose()
+                    response.raise_for_status()
+                    return response
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+                if attempt >= self.MAX_ATTEMPTS:
+                    raise
+                reason = type(e).__name__
+            delay = self.BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            metrics.increment("media_download.retries")
+            logger.warning(f"[MediaDownloader] Tentativa {attempt} falhou ({reason}). Nova tentativa em {delay:.2f}s.")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _iter_limited(self, response: httpx.Response, limit: int, started: float) -> AsyncIterator[bytes]:
+        received = 0
+        async for chunk in response.aiter_bytes(self._CHUNK_SIZE):
+            received += len(chunk)
+            if received > limit:
+                raise MediaTooLargeError(f"Mídia excedeu o limite de {limit} bytes durante o download.")
+            yield chunk
+        metrics.increment("media_download.completed")
+        metrics.observe("media_download.latency_ms", (time.monotonic() - started) * 1000)
+        metrics.observe("media_download.bytes", received)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _set_in_flight(self, delta: int):
+        self._in_flight += delta
+        metrics.set_gauge("media_download.in_flight", self._in_flight)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def close(self):
+        await self.http_client.aclose()
+        logger.info("[MediaDownloader] Pool de conexões encerrado.")
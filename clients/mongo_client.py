@@ -32,6 +32,28 @@ class MongoDBClient(IDB):
         except Exception as e:
             logger.error(f"[MongoDBClient] Erro ao buscar em '{collection_key}': {e}", exc_info=True)
             return None
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def find_many(
+        self,
+        collection_key: str,
+        filter: dict[str, Any],
+        projection: Optional[dict[str, Any]] = None,
+        sort: Optional[list[tuple[str, int]]] = None,
+        limit: int = 0
+    ) -> list[dict[str, Any]]:
+        try:
+            collect = self.database[collection_key]
+            cursor = collect.find(filter, projection=projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            return await cursor.to_list(length=limit or None)
+        except Exception as e:
+            logger.error(f"[MongoDBClient] Erro ao listar '{collection_key}': {e}", exc_info=True)
+            return []
+
 #--------------------------------------------------------------------------------------------------------------------#
 
     async def insert_one(self, collection_key: str, data: dict[str, Any]):
@@ -62,6 +84,32 @@ class MongoDBClient(IDB):
             logger.error(f"[MongoDBClient] Erro ao atualizar/upsert em '{collection_key}': {e}", exc_info=True)
             return None
         
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def push_to_array(
+        self,
+        collection_key: str,
+        filter: dict[str, Any],
+        field: str,
+        items: list[Any],
+        slice_limit: int,
+        set_data: Optional[dict[str, Any]] = None,
+        upsert: bool = False
+    ):
+        """Anexa `items` ao array `field` ($push/$each) mantendo só os últimos `slice_limit` elementos ($slice)."""
+        try:
+            collect = self.database[collection_key]
+            update_data: dict[str, Any] = {"$push": {field: {"$each": items, "$slice": -slice_limit}}}
+            if set_data:
+                update_data["$set"] = set_data
+            result = await collect.update_one(filter, update_data, upsert=upsert)
+            logger.info(f"[MongoDBClient] {len(items)} itens anexados a '{field}' em '{collection_key}'.")
+            return result
+
+        except Exception as e:
+            logger.error(f"[MongoDBClient] Erro ao anexar em '{collection_key}.{field}': {e}", exc_info=True)
+            return None
+
 #--------------------------------------------------------------------------------------------------------------------#
 
     def find_one_sync(self, collection_key: str, filter: dict[str, Any]) -> Optional[dict[str, Any]]:
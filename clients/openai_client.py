@@ -1,21 +1,21 @@
 from interfaces.clients.ia_interface import IAI
+from interfaces.clients.transcription_interface import ITranscriptionEngine
 from openai.types.audio import Transcription
 from openai.types.chat import ChatCompletion
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
 from openai import AsyncOpenAI 
+from utils.metrics import metrics
 from utils.logger import logger
+import base64
+import time
 import os
-import io
-import asyncio  
-import tempfile 
-import whisper
 
 
 #--------------------------------------------------------------------------------------------------------------------#
 class OpenIAClient(IAI):
 #--------------------------------------------------------------------------------------------------------------------#
 
-    def __init__(self):
+    def __init__(self, transcription_engine: Optional[ITranscriptionEngine] = None):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             logger.error("OPENAI_API_KEY não definida no ambiente.")
@@ -23,56 +23,54 @@ class OpenIAClient(IAI):
             
         self.client = AsyncOpenAI(api_key=api_key) 
         self.max_output_tokens = int(os.getenv("OPENAI_MAX_OUTPUT_TOKENS", "2048")) 
+        self.vision_model = os.getenv("OPENAI_VISION_MODEL", "gpt-4o-mini")
         logger.info("AsyncOpenAIClient (OpenIAClient) inicializado.") 
 
-        self.whisper_model = None
-        if whisper:
-            try:
-                self.whisper_model = whisper.load_model("base")
-                logger.info("Modelo Whisper (local) 'base' carregado com sucesso.")
-            except Exception as e:
-                logger.error(f"Falha ao carregar o modelo Whisper local: {e}")
-                logger.error("Verifique se o FFMPEG está instalado e no PATH do sistema.")
-        else:
-            logger.error("Transcrição de áudio está DESABILITADA (whisper não importado).")
+        # A engine é montada no ClientContainer (create_transcription_engine); None = transcrição desabilitada.
+        self.transcription_engine = transcription_engine
 
 #--------------------------------------------------------------------------------------------------------------------#
 
-    async def transcribe_audio(self, audio_buffer: io.BytesIO) -> str:
+    async def transcribe_audio(self, audio_bytes: bytes | memoryview) -> str:
 
-        if not self.whisper_model:
-            logger.error("Transcrição falhou: Modelo Whisper local não está carregado.")
+        if not self.transcription_engine:
+            logger.error("Transcrição falhou: nenhuma engine de transcrição disponível (WHISPER_MODE).")
             return "[ERRO: Modelo Whisper não carregado]"
 
-        temp_file_path = ""
         try:
-            ext = os.path.splitext(audio_buffer.name)[-1] or ".ogg"
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
-                tmp_file.write(audio_buffer.getvalue())
-                temp_file_path = tmp_file.name
-
-            logger.info(f"Áudio salvo em arquivo temporário: {temp_file_path}")
-
-
-            def _run_transcription_sync():
-                result = self.whisper_model.transcribe(temp_file_path, fp16=False)
-                return result["text"]
-            transcription = await asyncio.to_thread(_run_transcription_sync)
-            
-            logger.info("Áudio (local) transcrito com sucesso.")
+            transcription = await self.transcription_engine.transcribe(audio_bytes)
+            logger.info("Áudio transcrito com sucesso.")
             return transcription
 
         except Exception as e:
-            logger.error(f"Erro ao transcrever áudio (local): {e}", exc_info=True)
+            logger.error(f"Erro ao transcrever áudio: {e}", exc_info=True)
             if "ffmpeg" in str(e).lower():
                 logger.critical("ERRO: 'ffmpeg' não encontrado. "
                                 "O Whisper precisa do ffmpeg instalado no PATH do sistema.")
             return ""
-        finally:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-                logger.debug(f"Arquivo temporário {temp_file_path} removido.")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def describe_image(self, image_bytes: bytes, mime_type: str, prompt: str) -> str:
+        try:
+            data_url = f"data:{mime_type.split(';')[0]};base64,{base64.b64encode(image_bytes).decode('ascii')}"
+            response: ChatCompletion = await self.client.chat.completions.create(
+                model=self.vision_model,
+                messages=[{
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "image_url", "image_url": {"url": data_url, "detail": "low"}},
+                    ],
+                }],
+                max_tokens=self.max_output_tokens,
+            )
+            logger.info("Imagem descrita com sucesso pelo modelo de visão.")
+            return response.choices[0].message.content or ""
+
+        except Exception as e:
+            logger.error(f"Erro ao descrever imagem: {e}", exc_info=True)
+            return ""
 
 #--------------------------------------------------------------------------------------------------------------------#
 
@@ -96,10 +94,54 @@ class OpenIAClient(IAI):
             if kwargs:
                 api_kwargs.update(kwargs)
             
+            started = time.monotonic()
             response: ChatCompletion = await self.client.chat.completions.create(**api_kwargs) 
+            metrics.observe(f"openai.completion_ms.{model}", (time.monotonic() - started) * 1000)
+            if response.usage:
+                metrics.observe(f"openai.prompt_tokens.{model}", response.usage.prompt_tokens)
             logger.info("Resposta da OpenAI (ChatCompletion) recebida com sucesso.") 
             return response
             
         except Exception as e:
             logger.error(f"Erro ao chamar ChatCompletions: {e}", exc_info=True) 
-            raise e
\ No newline at end of file
+            raise e
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def stream_model_response(
+        self,
+        model: str,
+        input_messages: list[dict[str, Any]],
+        **kwargs
+        ) -> AsyncIterator[str]:
+        """Gera os deltas de texto da resposta (stream=True), sem ferramentas."""
+        api_kwargs = {
+            "model": model,
+            "messages": input_messages,
+            "temperature": 0.5,
+            "max_tokens": self.max_output_tokens,
+            "top_p": 1,
+            "stream": True,
+        }
+        if kwargs:
+            api_kwargs.update(kwargs)
+        started = time.monotonic()
+        first_token = True
+        try:
+            stream = await self.client.chat.completions.create(**api_kwargs)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token:
+                    metrics.observe(f"openai.first_token_ms.{model}", (time.monotonic() - started) * 1000)
+                    first_token = False
+                yield delta
+            metrics.observe(f"openai.completion_ms.{model}", (time.monotonic() - started) * 1000)
+            logger.info("Resposta da OpenAI (stream) concluída com sucesso.")
+
+        except Exception as e:
+            logger.error(f"Erro ao chamar ChatCompletions (stream): {e}", exc_info=True)
+            raise e
@@ -2,10 +2,105 @@ from interfaces.repositories.message_fragment_repository_interface import IMessa
 from interfaces.clients.queue_interface import IQueue
 from typing import Any, Optional
 from utils.logger import logger
+from utils import json_codec
 import redis.asyncio as redis
-import json
 import os
 
+_DRAIN_QUEUE_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+if #items == 0 then
+    return items
+end
+local prefix = ARGV[1]
+local stale_before = tonumber(ARGV[2])
+local ordered = {}
+for i = #items, 1, -1 do
+    local item = items[i]
+    if prefix ~= '' and string.sub(item, 1, #prefix) == prefix then
+        local created_at = tonumber(string.match(item, ':([%d%.]+)$'))
+        if created_at and created_at > stale_before then
+            return false
+        end
+    else
+        ordered[#ordered + 1] = item
+    end
+end
+redis.call('DEL', KEYS[1])
+return ordered
+"""
+
+_REPLACE_IN_QUEUE_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+for i, item in ipairs(items) do
+    if string.sub(item, 1, #ARGV[1]) == ARGV[1] then
+        if ARGV[2] == '' then
+            redis.call('LREM', KEYS[1], 1, item)
+        else
+            redis.call('LSET', KEYS[1], i - 1, ARGV[2])
+        end
+        return 1
+    end
+end
+return 0
+"""
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_EXTEND_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_TAKE_TOKENS_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local last = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {tostring(wait), tostring(tokens)}
+"""
+
+_CLAIM_EXPIRED_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, member in ipairs(due) do
+    redis.call('ZREM', KEYS[1], member)
+end
+return due
+"""
+
+_TRACK_IN_INDEX_SCRIPT = """
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[4])
+local excess = redis.call('ZCARD', KEYS[1]) - tonumber(ARGV[3])
+if excess <= 0 then
+    return 0
+end
+local evicted = redis.call('ZRANGE', KEYS[1], 0, excess - 1)
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, excess - 1)
+for _, member in ipairs(evicted) do
+    redis.call('DEL', ARGV[5] .. member)
+end
+return #evicted
+"""
 
 #--------------------------------------------------------------------------------------------------------------------#
 class RedisClient(IQueue, IMessageFragmentRepository):
@@ -24,19 +119,34 @@ class RedisClient(IQueue, IMessageFragmentRepository):
             password=password, 
             decode_responses=True 
         )
+        self._drain_queue_script = self.app.register_script(_DRAIN_QUEUE_SCRIPT)
+        self._replace_in_queue_script = self.app.register_script(_REPLACE_IN_QUEUE_SCRIPT)
+        self._release_lock_script = self.app.register_script(_RELEASE_LOCK_SCRIPT)
+        self._extend_lock_script = self.app.register_script(_EXTEND_LOCK_SCRIPT)
+        self._take_tokens_script = self.app.register_script(_TAKE_TOKENS_SCRIPT)
+        self._claim_expired_script = self.app.register_script(_CLAIM_EXPIRED_SCRIPT)
+        self._track_in_index_script = self.app.register_script(_TRACK_IN_INDEX_SCRIPT)
         logger.info("[RedisClient] Cliente (assíncrono) inicializado.")
 
 #--------------------------------------------------------------------------------------------------------------------#
 
-    async def push_to_queue(self, queue_key: str, message: Any):
+    async def push_to_queue(self, queue_key: str, message: Any, ttl_seconds: Optional[int] = None) -> bool:
         try:
             if isinstance(message, (dict, list)):
-                message = json.dumps(message)
-            await self.app.lpush(queue_key, message)
+                message = json_codec.dumps(message)
+            if ttl_seconds:
+                async with self.app.pipeline(transaction=True) as pipe:
+                    pipe.lpush(queue_key, message)
+                    pipe.expire(queue_key, ttl_seconds)
+                    await pipe.execute()
+            else:
+                await self.app.lpush(queue_key, message)
             logger.info(f"[RedisClient] Mensagem adicionada à fila '{queue_key}'.")
+            return True
 
         except Exception as e:
             logger.error(f"[RedisClient] Erro ao adicionar à fila '{queue_key}': {e}", exc_info=True)
+            return False
 
 #--------------------------------------------------------------------------------------------------------------------#
 
@@ -73,6 +183,162 @@ class RedisClient(IQueue, IMessageFragmentRepository):
         except Exception as e:
             logger.error(f"[RedisClient] Erro ao deletar fila '{queue_key}': {e}", exc_info=True)
 
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def blocking_pop(self, queue_key: str, timeout: int) -> Optional[str]:
+        try:
+            result = await self.app.brpop(queue_key, timeout=timeout)
+            return result[1] if result else None
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro no pop bloqueante da fila '{queue_key}': {e}", exc_info=True)
+            return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def drain_queue(self, queue_key: str, pending_prefix: Optional[str] = None, stale_before: float = 0.0) -> Optional[list[str]]:
+        """
+        LRANGE + DEL em um único script (1 round trip, atômico). Retorna na ordem de chegada (FIFO).
+        Se `pending_prefix` for informado e a fila tiver um placeholder desse tipo criado depois de
+        `stale_before`, nada é removido e o retorno é None. Placeholders antigos são descartados.
+        """
+        try:
+            return await self._drain_queue_script(keys=[queue_key], args=[pending_prefix or "", stale_before])
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro ao drenar a fila '{queue_key}': {e}", exc_info=True)
+            return []
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def replace_in_queue(self, queue_key: str, match_prefix: str, value: str) -> bool:
+        """Substitui (in-place) o primeiro item que começa com `match_prefix`. Valor vazio remove o item."""
+        try:
+            return bool(await self._replace_in_queue_script(keys=[queue_key], args=[match_prefix, value]))
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro ao substituir item na fila '{queue_key}': {e}", exc_info=True)
+            return False
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def get_value(self, key: str) -> Optional[str]:
+        try:
+            return await self.app.get(key)
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro ao ler a chave '{key}': {e}", exc_info=True)
+            return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def set_value(self, key: str, value: Any, ttl_seconds: Optional[int] = None):
+        try:
+            await self.app.set(key, value, ex=ttl_seconds)
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro ao gravar a chave '{key}': {e}", exc_info=True)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def set_if_absent(self, key: str, value: Any, ttl_seconds: int) -> Optional[bool]:
+        """SET NX EX: True se a chave foi criada, False se já existia, None se o Redis falhou."""
+        try:
+            return bool(await self.app.set(key, value, nx=True, ex=ttl_seconds))
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro no SET NX da chave '{key}': {e}", exc_info=True)
+            return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def acquire_lock(self, lock_key: str, token: str, ttl_seconds: int) -> bool:
+        try:
+            acquired = await self.app.set(lock_key, token, nx=True, ex=ttl_seconds)
+            return bool(acquired)
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro ao adquirir lock '{lock_key}': {e}", exc_info=True)
+            return False
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def release_lock(self, lock_key: str, token: str) -> bool:
+        """Só libera o lock se ele ainda pertence a este token (evita apagar o lock de outro worker após expirar)."""
+        try:
+            return bool(await self._release_lock_script(keys=[lock_key], args=[token]))
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro ao liberar lock '{lock_key}': {e}", exc_info=True)
+            return False
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def extend_lock(self, lock_key: str, token: str, ttl_seconds: int) -> bool:
+        """Renova o TTL só se o lock ainda pertence a este token (compare-and-set)."""
+        try:
+            return bool(await self._extend_lock_script(keys=[lock_key], args=[token, ttl_seconds]))
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro ao renovar lock '{lock_key}': {e}", exc_info=True)
+            return False
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def take_tokens(self, bucket_key: str, cost: float, capacity: float, refill_per_second: float) -> Optional[tuple[float, float]]:
+        """
+        Token bucket compartilhado entre processos (relógio do próprio Redis).
+        Retorna (espera em segundos, tokens restantes); espera 0 significa que o custo foi debitado.
+        """
+        try:
+            ttl_seconds = max(60, int(capacity / refill_per_second) * 2)
+            wait, tokens = await self._take_tokens_script(
+                keys=[bucket_key], args=[capacity, refill_per_second, cost, ttl_seconds]
+            )
+            return float(wait), float(tokens)
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro no token bucket '{bucket_key}': {e}", exc_info=True)
+            return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def schedule_deadline(self, schedule_key: str, member: str, deadline: float, keep_existing: bool = False):
+        try:
+            await self.app.zadd(schedule_key, {member: deadline}, nx=keep_existing)
+            logger.debug(f"[RedisClient] Deadline de '{member}' agendado em '{schedule_key}' para {deadline:.3f}.")
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro ao agendar deadline em '{schedule_key}': {e}", exc_info=True)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def claim_expired(self, schedule_key: str, now: float, limit: int) -> list[str]:
+        """Remove e retorna (atomicamente) os membros com deadline <= now. Cada membro é entregue a um único worker."""
+        try:
+            return await self._claim_expired_script(keys=[schedule_key], args=[now, limit])
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro ao reivindicar deadlines expirados em '{schedule_key}': {e}", exc_info=True)
+            return []
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def track_in_index(self, index_key: str, member: str, score: float, max_members: int, min_score: float, value_prefix: str) -> int:
+        """
+        Registra `member` no índice (sorted set) e o mantém limitado: remove entradas com score < min_score
+        e, acima de `max_members`, despeja as mais antigas junto com as chaves `value_prefix + member`.
+        """
+        try:
+            return int(await self._track_in_index_script(
+                keys=[index_key],
+                args=[member, score, max_members, min_score, value_prefix]
+            ))
+
+        except Exception as e:
+            logger.error(f"[RedisClient] Erro ao atualizar o índice '{index_key}': {e}", exc_info=True)
+            return 0
+
 #--------------------------------------------------------------------------------------------------------------------#
             
     async def close(self):
@@ -85,13 +351,50 @@ class RedisClient(IQueue, IMessageFragmentRepository):
 
 #--------------------------------------------------------------------------------------------------------------------#
 
-    async def get_and_clear_fragments(self, key: str) -> list[str]:
-        logger.debug(f"[RedisClient] get_and_clear_fragments (interface) -> get_queue_fragments + delete_queue")
-        try:
-            fragments = await self.get_queue_fragments(key)
-            if fragments:
-                await self.delete_queue(key)
-            return fragments
-        except Exception as e:
-            logger.error(f"[RedisClient] Erro em get_and_clear_fragments: {e}", exc_info=True)
-            return []
\ No newline at end of file
+    async def get_and_clear_fragments(self, key: str, pending_prefix: Optional[str] = None, stale_before: float = 0.0) -> Optional[list[str]]:
+        logger.debug(f"[RedisClient] get_and_clear_fragments (interface) -> drain_queue")
+        return await self.drain_queue(key, pending_prefix=pending_prefix, stale_before=stale_before)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def resolve_fragment(self, key: str, match_prefix: str, value: str) -> bool:
+        logger.debug(f"[RedisClient] resolve_fragment (interface) -> replace_in_queue")
+        return await self.replace_in_queue(key, match_prefix, value)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def schedule_flush(self, key: str, member: str, deadline: float, keep_existing: bool = False):
+        logger.debug(f"[RedisClient] schedule_flush (interface) -> schedule_deadline")
+        return await self.schedule_deadline(schedule_key=key, member=member, deadline=deadline, keep_existing=keep_existing)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def claim_due_flushes(self, key: str, now: float, limit: int) -> list[str]:
+        logger.debug(f"[RedisClient] claim_due_flushes (interface) -> claim_expired")
+        return await self.claim_expired(schedule_key=key, now=now, limit=limit)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def get_flush_window(self, key: str) -> Optional[float]:
+        value = await self.get_value(key)
+        return float(value) if value else None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def set_flush_window(self, key: str, window: float, ttl_seconds: int):
+        await self.set_value(key, window, ttl_seconds=ttl_seconds)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def acquire_lane(self, key: str, token: str, ttl_seconds: int) -> bool:
+        return await self.acquire_lock(lock_key=key, token=token, ttl_seconds=ttl_seconds)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def extend_lane(self, key: str, token: str, ttl_seconds: int) -> bool:
+        return await self.extend_lock(lock_key=key, token=token, ttl_seconds=ttl_seconds)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def release_lane(self, key: str, token: str) -> bool:
+        return await self.release_lock(lock_key=key, token=token)
\ No newline at end of file
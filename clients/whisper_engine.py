@@ -0,0 +1,241 @@
+from interfaces.clients.transcription_interface import ITranscriptionEngine
+from interfaces.clients.queue_interface import IQueue
+from concurrent.futures import ProcessPoolExecutor
+from utils.metrics import metrics
+from utils.logger import logger
+from utils import json_codec
+from typing import Any, Optional
+import multiprocessing
+import subprocess
+import asyncio
+import base64
+import math
+import time
+import uuid
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+# Código executado DENTRO dos processos worker (cada worker carrega o modelo uma única vez).
+#--------------------------------------------------------------------------------------------------------------------#
+
+_worker_model: Any = None
+_SAMPLE_RATE = 16000
+
+
+def _load_worker_model(model_name: str):
+    global _worker_model
+    import whisper
+    _worker_model = whisper.load_model(model_name)
+
+
+def _decode_audio_bytes(audio_bytes: bytes) -> Any:
+    """Decodifica o áudio em memória (ffmpeg via stdin/stdout) para float32 mono a 16 kHz, sem tocar o disco."""
+    import numpy as np
+    command = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(_SAMPLE_RATE),
+        "-loglevel", "error",
+        "pipe:1",
+    ]
+    process = subprocess.run(command, input=audio_bytes, capture_output=True, check=False)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg falhou ao decodificar o áudio: {process.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(process.stdout, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def _transcribe_in_worker(audio_bytes: bytes) -> str:
+    audio = _decode_audio_bytes(audio_bytes)
+    result = _worker_model.transcribe(audio, fp16=False)
+    return result["text"]
+
+
+def _worker_ready(hold_seconds: float) -> int:
+    # Segura o worker um instante para que os próximos jobs de aquecimento caiam em outros processos.
+    time.sleep(hold_seconds)
+    return os.getpid()
+
+#--------------------------------------------------------------------------------------------------------------------#
+class WhisperEngine(ITranscriptionEngine):
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Pool de processos para o Whisper local: cada worker mantém o modelo carregado ("quente"),
+    vários áudios são transcritos em paralelo (fora do GIL e do event loop da API).
+    O pool (e o modelo) só é criado no primeiro áudio: processos que só recebem texto não pagam o custo.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        job_timeout_seconds: Optional[float] = None,
+    ):
+        self.MODEL_NAME = model_name or os.getenv("WHISPER_MODEL", "base")
+        self.WORKERS = workers or int(os.getenv("WHISPER_WORKERS", "2"))
+        self.MAX_CONCURRENCY = max_concurrency or int(os.getenv("WHISPER_MAX_CONCURRENCY", str(self.WORKERS)))
+        self.JOB_TIMEOUT_SECONDS = job_timeout_seconds or float(os.getenv("WHISPER_JOB_TIMEOUT_SECONDS", "180"))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+        self._waiting = 0
+        self._orphaned = 0
+        logger.info(
+            f"[WhisperEngine] Configurado (carga sob demanda): modelo '{self.MODEL_NAME}', {self.WORKERS} workers, "
+            f"concorrência {self.MAX_CONCURRENCY}, timeout {self.JOB_TIMEOUT_SECONDS}s."
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 'spawn': não herda threads/sockets do processo da API.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_worker_model,
+                initargs=(self.MODEL_NAME,),
+            )
+            metrics.increment("whisper.pool_started")
+            logger.info(f"[WhisperEngine] Pool criado no primeiro áudio ({self.WORKERS} workers carregando '{self.MODEL_NAME}').")
+        return self._executor
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def warm_up(self, max_rounds: int = 20):
+        """
+        Sobe o pool e espera o modelo carregar em TODOS os workers (usado pelo worker dedicado).
+        O initializer roda antes do primeiro job de cada processo, então um job concluído por um pid
+        prova que aquele worker está quente; repete até ver todos os pids.
+        """
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        ready_pids: set[int] = set()
+        for _ in range(max_rounds):
+            pids = await asyncio.gather(*(
+                loop.run_in_executor(executor, _worker_ready, 0.2) for _ in range(self.WORKERS)
+            ))
+            ready_pids.update(pids)
+            if len(ready_pids) >= self.WORKERS:
+                break
+        metrics.set_gauge("whisper.workers_ready", len(ready_pids))
+        logger.info(
+            f"[WhisperEngine] Modelo carregado em {len(ready_pids)}/{self.WORKERS} workers "
+            f"em {time.monotonic() - started:.1f}s."
+        )
+
+    async def transcribe(self, audio_bytes: bytes | memoryview) -> str:
+        enqueued = time.monotonic()
+        self._set_waiting(+1)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._set_waiting(-1)
+        future: Optional[asyncio.Future] = None
+        try:
+            metrics.observe("whisper.queue_wait_ms", (time.monotonic() - enqueued) * 1000)
+            started = time.monotonic()
+            loop = asyncio.get_running_loop()
+            # memoryview não é picklable: a única cópia é a serialização para o processo worker.
+            future = loop.run_in_executor(self._get_executor(), _transcribe_in_worker, bytes(audio_bytes))
+            try:
+                text = await asyncio.wait_for(asyncio.shield(future), timeout=self.JOB_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                metrics.increment("whisper.timeouts")
+                raise TimeoutError(f"Transcrição excedeu {self.JOB_TIMEOUT_SECONDS}s.")
+            metrics.observe("whisper.transcribe_ms", (time.monotonic() - started) * 1000)
+            return text
+        finally:
+            if future is None or future.done():
+                self._semaphore.release()
+            else:
+                # O worker continua ocupado com o job abandonado: o slot só volta quando ele terminar,
+                # senão o semáforo deixaria enfileirar mais jobs do que há workers livres.
+                self._set_orphaned(+1)
+                future.add_done_callback(self._release_orphaned_slot)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _release_orphaned_slot(self, future: asyncio.Future):
+        if not future.cancelled():
+            future.exception()
+        self._set_orphaned(-1)
+        self._semaphore.release()
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _set_waiting(self, delta: int):
+        self._waiting += delta
+        metrics.set_gauge("whisper.jobs_waiting", self._waiting)
+
+    def _set_orphaned(self, delta: int):
+        self._orphaned += delta
+        metrics.set_gauge("whisper.jobs_orphaned", self._orphaned)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def shutdown(self):
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        logger.info("[WhisperEngine] Pool de processos encerrado.")
+
+#--------------------------------------------------------------------------------------------------------------------#
+class RemoteWhisperEngine(ITranscriptionEngine):
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Transcrição delegada a um worker dedicado (transcription_worker.py) via Redis:
+    o processo da API não carrega o modelo nem o torch.
+    """
+
+    JOBS_QUEUE_KEY = "transcription:jobs"
+    RESULT_KEY_PREFIX = "transcription:result:"
+
+    def __init__(self, queue_client: IQueue, job_timeout_seconds: Optional[float] = None):
+        self.JOB_TIMEOUT_SECONDS = job_timeout_seconds or float(os.getenv("WHISPER_JOB_TIMEOUT_SECONDS", "180"))
+        self.queue_client = queue_client
+        logger.info(f"[RemoteWhisperEngine] Transcrição remota via '{self.JOBS_QUEUE_KEY}' (timeout {self.JOB_TIMEOUT_SECONDS}s).")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def transcribe(self, audio_bytes: bytes | memoryview) -> str:
+        job_id = uuid.uuid4().hex
+        result_key = f"{self.RESULT_KEY_PREFIX}{job_id}"
+        job = {
+            "job_id": job_id,
+            "result_key": result_key,
+            "audio": base64.b64encode(audio_bytes).decode("ascii"),
+            "deadline": time.time() + self.JOB_TIMEOUT_SECONDS,
+        }
+        started = time.monotonic()
+        await self.queue_client.push_to_queue(self.JOBS_QUEUE_KEY, job)
+        raw_result = await self.queue_client.blocking_pop(result_key, math.ceil(self.JOB_TIMEOUT_SECONDS))
+        if not raw_result:
+            metrics.increment("whisper.timeouts")
+            raise TimeoutError(f"Transcrição remota excedeu {self.JOB_TIMEOUT_SECONDS}s.")
+        result = json_codec.loads(raw_result)
+        if result.get("error"):
+            raise RuntimeError(f"Worker de transcrição falhou: {result['error']}")
+        metrics.observe("whisper.remote_roundtrip_ms", (time.monotonic() - started) * 1000)
+        return result.get("text", "")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def shutdown(self):
+        return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+def create_transcription_engine(queue_client: Optional[IQueue] = None) -> Optional[ITranscriptionEngine]:
+    """WHISPER_MODE: 'local' (pool sob demanda neste processo), 'remote' (worker dedicado) ou 'off'."""
+    mode = os.getenv("WHISPER_MODE", "local").lower()
+    if mode == "off":
+        logger.warning("[WhisperEngine] WHISPER_MODE=off: transcrição de áudio desabilitada.")
+        return None
+    if mode == "remote":
+        if queue_client is None:
+            logger.error("[WhisperEngine] WHISPER_MODE=remote requer o cliente Redis; transcrição desabilitada.")
+            return None
+        return RemoteWhisperEngine(queue_client)
+    return WhisperEngine()
\ No newline at end of file
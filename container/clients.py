@@ -3,6 +3,7 @@ from clients.evolution_client import EvolutionClient
 from clients.openai_client import OpenIAClient
 from clients.mongo_client import MongoDBClient
 from clients.redis_client import RedisClient
+from clients.whisper_engine import create_transcription_engine
 from utils.logger import logger
 from clients.websearch_client import WebSearchClient
 
@@ -18,10 +19,11 @@ class ClientContainer:
 
     def _initialize_clients(self):
         """Inicializa clientes que NÃO dependem de dados do DB."""
-        self.register_client("IAI", OpenIAClient())
+        redis_client = RedisClient()
+        self.register_client("IAI", OpenIAClient(transcription_engine=create_transcription_engine(redis_client)))
         self.register_client("IChat", EvolutionClient()) 
         self.register_client("MongoDBClient", MongoDBClient()) 
-        self.register_client("RedisClient", RedisClient()) 
+        self.register_client("RedisClient", redis_client) 
         
         try:
             self.register_client("IWebSearch", WebSearchClient())
@@ -1,9 +1,16 @@
 from interfaces.repositories.message_fragment_repository_interface import IMessageFragmentRepository
 from interfaces.repositories.comunity_repository_interface import ICommunityRepository
 from interfaces.repositories.context_repository_interface import IContextRepository
+from interfaces.repositories.transcript_cache_repository_interface import ITranscriptCacheRepository
+from interfaces.repositories.event_dedup_repository_interface import IEventDedupRepository
+from interfaces.repositories.routing_decision_repository_interface import IRoutingDecisionRepository
 from repositories.message_fragment_repository import MessageFragmentRepository
 from repositories.community_repository import CommunityRepository
 from repositories.context_repository import ContextRepository
+from repositories.cached_context_repository import CachedContextRepository
+from repositories.transcript_cache_repository import TranscriptCacheRepository
+from repositories.event_dedup_repository import EventDedupRepository
+from repositories.routing_decision_repository import RoutingDecisionRepository
 from clients.mongo_client import MongoDBClient
 from clients.redis_client import RedisClient
 from utils.logger import logger
@@ -21,7 +28,10 @@ class RepositoryContainer:
 #--------------------------------------------------------------------------------------------------------------------#
 
     def _initialize_repositories(self, db_client: MongoDBClient, cache_client: RedisClient):
-        context_repo = ContextRepository(db_client=db_client)
+        context_repo = CachedContextRepository(
+            context_repository=ContextRepository(db_client=db_client),
+            cache_client=cache_client
+        )
         self.register_repository("IContextRepository", context_repo)
 
         community_repo = CommunityRepository(db_client=db_client)
@@ -30,6 +40,15 @@ class RepositoryContainer:
         fragment_repo = MessageFragmentRepository(cache_client=cache_client)
         self.register_repository("IMessageFragmentRepository", fragment_repo)
 
+        transcript_cache_repo = TranscriptCacheRepository(cache_client=cache_client)
+        self.register_repository("ITranscriptCacheRepository", transcript_cache_repo)
+
+        event_dedup_repo = EventDedupRepository(cache_client=cache_client)
+        self.register_repository("IEventDedupRepository", event_dedup_repo)
+
+        routing_decision_repo = RoutingDecisionRepository(db_client=db_client)
+        self.register_repository("IRoutingDecisionRepository", routing_decision_repo)
+
 #--------------------------------------------------------------------------------------------------------------------#
 
     def register_repository(self, interface_name: str, repo_instance: Any):
@@ -62,4 +81,22 @@ class RepositoryContainer:
 
     @property
     def fragments(self) -> IMessageFragmentRepository:
-        return self.get_repository("IMessageFragmentRepository")
\ No newline at end of file
+        return self.get_repository("IMessageFragmentRepository")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    def transcripts(self) -> ITranscriptCacheRepository:
+        return self.get_repository("ITranscriptCacheRepository")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    def events(self) -> IEventDedupRepository:
+        return self.get_repository("IEventDedupRepository")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    def routing(self) -> IRoutingDecisionRepository:
+        return self.get_repository("IRoutingDecisionRepository")
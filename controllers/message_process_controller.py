@@ -1,8 +1,12 @@
 from utils.logger import logger
 from services.media_processor_service import MediaProcessorService
 from services.message_queue_service import MessageQueueService
+from services.media_pipeline_service import MediaPipelineService
 from services.group_autorization_service import GroupAuthorizationService
+from interfaces.repositories.event_dedup_repository_interface import IEventDedupRepository
+from utils.metrics import metrics
 from typing import Any
+import asyncio
 
 #--------------------------------------------------------------------------------------------------------------------#
 class MessageProcessController:
@@ -11,24 +15,92 @@ class MessageProcessController:
     def __init__(self,
                  message_service: MessageQueueService,
                  media_service: MediaProcessorService,
-                 group_auth_service: GroupAuthorizationService):
+                 group_auth_service: GroupAuthorizationService,
+                 media_pipeline: MediaPipelineService,
+                 event_dedup: IEventDedupRepository):
         self.media_service = media_service
+        self.event_dedup = event_dedup
+        self.media_pipeline = media_pipeline
         self.queue_service = message_service
         self.group_auth = group_auth_service
         logger.info("MessageProcessController (async) inicializado com sucesso.")
 
 #--------------------------------------------------------------------------------------------------------------------#
 
+    _UPSERT_EVENTS = {"messages.upsert", "MESSAGES_UPSERT"}
+
     async def control(self, data: dict) -> tuple[dict[str, Any], int]:
-        logger.debug(f"[MessageProcessController]Controlador recebeu dados: {data}")
+        skip_reason = self._prefilter(data)
+        if skip_reason:
+            metrics.increment(f"webhook.prefiltered.{skip_reason}")
+            return ({"status": "received_ignored", "detail": skip_reason}, 200)
+        logger.debug("[MessageProcessController]Controlador recebeu dados: %s", data)
+        event_id = self._get_event_id(data)
+        if event_id and not await self.event_dedup.mark_if_new(event_id):
+            metrics.increment("webhook.duplicates")
+            logger.info(f"[MessageProcessController]Evento duplicado {event_id} ignorado.")
+            return ({"status": "received_duplicate", "detail": event_id}, 200)
+
+        response, status_code = await self._process(data)
+        if event_id and status_code >= 500:
+            # Falha interna: libera o evento para que a reentrega da Evolution seja processada.
+            await self.event_dedup.forget(event_id)
+        return response, status_code
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def control_batch(self, events: list[dict]) -> tuple[dict[str, Any], int]:
+        """Modo em lote da Evolution: cada evento passa pelo mesmo fluxo de `control`, em paralelo."""
+        results = await asyncio.gather(*(self.control(event) for event in events))
+        statuses = [response.get("status") for response, _ in results]
+        summary: dict[str, int] = {}
+        for status in statuses:
+            summary[status] = summary.get(status, 0) + 1
+        metrics.increment("webhook.batch_events", len(events))
+        logger.info(f"[MessageProcessController]Lote com {len(events)} eventos processado: {summary}")
+        return ({"status": "received_batch", "count": len(events), "summary": summary, "results": statuses}, 200)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _prefilter(self, data: dict) -> str | None:
+        """Classifica o evento por poucos campos; retorna o motivo para descartá-lo sem processamento completo."""
+        event = data.get('event')
+        if event and event not in self._UPSERT_EVENTS:
+            return "event_type"
+        data_obj = data.get('data')
+        if not isinstance(data_obj, dict):
+            return "invalid"
+        if (data_obj.get('key') or {}).get('fromMe', False):
+            return "from_me"
+        message_data = data_obj.get('message')
+        if not message_data:
+            return "status" if data_obj.get('status') else "invalid"
+        if not self.media_service.is_supported_message(message_data):
+            return "unsupported_type"
+        return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @staticmethod
+    def _get_event_id(data: dict) -> str | None:
+        key_obj = (data.get('data') or {}).get('key') or {}
+        message_id = key_obj.get('id')
+        if not message_id:
+            return None
+        return f"{key_obj.get('remoteJid', '')}:{message_id}"
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _process(self, data: dict) -> tuple[dict[str, Any], int]:
         try:
             processed_data = await self.media_service.treated_message(data)
             phone_jid = processed_data.get('Numero')       
             auth_id = processed_data.get('AuthId')         
             group_id = processed_data.get('GroupId')
             message_content = processed_data.get('Mensagem')
+            media = processed_data.get('Midia')
 
-            if not phone_jid or not message_content or not auth_id:
+            if not phone_jid or not (message_content or media) or not auth_id:
                 logger.info(f"[MessageProcessController]Mensagem ignorada. Motivo: {processed_data.get('message', 'Formato inválido')}")
                 return ({"status": "received_ignored", "detail": processed_data.get('message')}, 200)
             authorized_group_ids = ["120363424101109821@g.us","120363401865067709@g.us"]
@@ -47,10 +119,16 @@ class MessageProcessController:
                 logger.warning(f"Usuário {auth_id} (Telefone: {phone_jid}) não está autorizado")
                 return ({"status": "unauthorized", "message": "Usuário não autorizado para usar o agent"}, 403)
             phone_number_clean = phone_jid.split('@')[0] 
+
+            if media:
+                await self.media_pipeline.submit(phone=phone_number_clean, media=media)
+                logger.info(f"[MessageProcessController]Mídia de {phone_jid} (Auth: {auth_id}) enviada ao pipeline.")
+                return ({"status": "received_media_queued", "detail": f"Mídia de {phone_jid} enfileirada para processamento."}, 200)
             
             await self.queue_service.enqueue_message(
                 phone=phone_number_clean,
-                message=message_content
+                message=message_content,
+                source=processed_data.get('Tipo', 'text')
             )
 
             logger.info(f"[MessageProcessController]Mensagem de {phone_jid} (Auth: {auth_id}) adicionada com sucesso à fila.")
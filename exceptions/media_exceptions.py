@@ -0,0 +1,10 @@
+class MediaIntegrityError(ValueError):
+    """Mídia corrompida, truncada ou adulterada: o HMAC não confere com a mediaKey."""
+
+
+class MediaTooLargeError(ValueError):
+    """Mídia maior que o limite configurado: o download é interrompido sem ler o restante do corpo."""
+
+
+class MediaQueueError(RuntimeError):
+    """O job de mídia não pôde ser publicado na fila: o webhook deve falhar para a Evolution reenviar o evento."""
@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Callable
+
+# Envia a resposta ao usuário à medida que os deltas chegam; retorna o texto completo.
+ReplyStream = Callable[[AsyncIterator[str]], Awaitable[str]]
 
 class IAgent(ABC): 
 
@@ -23,4 +26,4 @@ class IAgent(ABC):
     def tools(self)-> Optional[List[Dict[str, Any]]]: ...
 
     @abstractmethod
-    async def exec(self, context: List[Dict[str, Any]], phone: str) -> List[Dict[str, Any]]: ...
\ No newline at end of file
+    async def exec(self, context: List[Dict[str, Any]], phone: str, reply_stream: Optional[ReplyStream] = None) -> List[Dict[str, Any]]: ...
\ No newline at end of file
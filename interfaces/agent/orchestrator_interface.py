@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Optional
 
 class IOrchestrator(ABC):
     @property
@@ -15,4 +15,4 @@ class IOrchestrator(ABC):
     def system_prompt(self) -> dict: ...
 
     @abstractmethod
-    async def execute(self, context: list[dict[str, Any]], phone: str) -> list[dict[str, Any]]: ...
\ No newline at end of file
+    async def execute(self, context: list[dict[str, Any]], phone: str, affinity: Optional[dict[str, Any]] = None) -> list[dict[str, Any]]: ...
\ No newline at end of file
@@ -17,4 +17,7 @@ class IChat(ABC):
     async def is_valid()-> bool: ...
 
     @abstractmethod
-    async def send_message()->bool: ...
\ No newline at end of file
+    async def send_message()->bool: ...
+
+    @abstractmethod
+    async def send_presence()->bool: ...
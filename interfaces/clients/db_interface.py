@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 class IDB(ABC):
     
@@ -7,10 +7,18 @@ class IDB(ABC):
     async def find_one(self, collection_key: str, filter: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         ...
 
+    @abstractmethod
+    async def find_many(self, collection_key: str, filter: Dict[str, Any], projection: Optional[Dict[str, Any]] = None, sort: Optional[List[Tuple[str, int]]] = None, limit: int = 0) -> List[Dict[str, Any]]:
+        ...
+
     @abstractmethod
     async def insert_one(self, collection_key: str, data: Dict[str, Any]) -> Any:
         ...
 
     @abstractmethod
     async def update_one(self, collection_key: str, filter: Dict[str, Any], data: Dict[str, Any], upsert: bool = False) -> Any:
-        ...
\ No newline at end of file
+        ...
+
+    @abstractmethod
+    async def push_to_array(self, collection_key: str, filter: Dict[str, Any], field: str, items: List[Any], slice_limit: int, set_data: Optional[Dict[str, Any]] = None, upsert: bool = False) -> Any:
+        ...
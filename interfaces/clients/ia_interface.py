@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
 class IAI(ABC):
     
     @abstractmethod
-    def transcribe_audio(self, audio_bytes: str) -> str: ...
+    async def transcribe_audio(self, audio_bytes: bytes | memoryview) -> str: ...
+
+    @abstractmethod
+    async def describe_image(self, image_bytes: bytes, mime_type: str, prompt: str) -> str: ...
 
     @abstractmethod
     async def create_model_response(
@@ -13,6 +17,14 @@ class IAI(ABC):
         tools: list[dict] | None = None
     ) -> dict: ...
 
+    @abstractmethod
+    def stream_model_response(
+        self,
+        model: str,
+        input_messages: list[dict],
+        **kwargs
+    ) -> AsyncIterator[str]: ...
+
     '''@abstractmethod
     def function_call_output(
         function_call_id: str,
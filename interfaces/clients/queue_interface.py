@@ -4,7 +4,7 @@ from typing import List, Any, Optional
 class IQueue(ABC):
 
     @abstractmethod
-    async def push_to_queue(self, queue_key: str, message: Any) -> None:
+    async def push_to_queue(self, queue_key: str, message: Any, ttl_seconds: Optional[int] = None) -> bool:
         ...
 
     @abstractmethod
@@ -18,7 +18,59 @@ class IQueue(ABC):
     @abstractmethod
     async def delete_queue(self, queue_key: str) -> None:
         ...
+
+    @abstractmethod
+    async def blocking_pop(self, queue_key: str, timeout: int) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def drain_queue(self, queue_key: str, pending_prefix: Optional[str] = None, stale_before: float = 0.0) -> Optional[List[str]]:
+        ...
+
+    @abstractmethod
+    async def replace_in_queue(self, queue_key: str, match_prefix: str, value: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def get_value(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set_value(self, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def set_if_absent(self, key: str, value: Any, ttl_seconds: int) -> Optional[bool]:
+        ...
+
+    @abstractmethod
+    async def acquire_lock(self, lock_key: str, token: str, ttl_seconds: int) -> bool:
+        ...
+
+    @abstractmethod
+    async def release_lock(self, lock_key: str, token: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def extend_lock(self, lock_key: str, token: str, ttl_seconds: int) -> bool:
+        ...
+
+    @abstractmethod
+    async def take_tokens(self, bucket_key: str, cost: float, capacity: float, refill_per_second: float) -> Optional[tuple[float, float]]:
+        ...
+
+    @abstractmethod
+    async def schedule_deadline(self, schedule_key: str, member: str, deadline: float, keep_existing: bool = False) -> None:
+        ...
+
+    @abstractmethod
+    async def claim_expired(self, schedule_key: str, now: float, limit: int) -> List[str]:
+        ...
     
+    @abstractmethod
+    async def track_in_index(self, index_key: str, member: str, score: float, max_members: int, min_score: float, value_prefix: str) -> int:
+        ...
+
     @abstractmethod
     async def close(self) -> None:
         ...
\ No newline at end of file
@@ -0,0 +1,11 @@
+from abc import ABC, abstractmethod
+
+class ITranscriptionEngine(ABC):
+
+    @abstractmethod
+    async def transcribe(self, audio_bytes: bytes | memoryview) -> str:
+        ...
+
+    @abstractmethod
+    def shutdown(self) -> None:
+        ...
@@ -1,9 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 class IContextRepository(ABC):
     @abstractmethod
     async def get_context(self, phone: str) -> Optional[Dict[str, Any]]: ...
     
     @abstractmethod
-    async def save_context(self, phone: str, context: Dict[str, Any]): ...
\ No newline at end of file
+    async def save_context(self, phone: str, context: Dict[str, Any]) -> bool: ...
+
+    @abstractmethod
+    async def append_messages(self, phone: str, messages: List[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None) -> bool: ...
+
+    @abstractmethod
+    async def compact_history(self, phone: str, memory: str, keep_last: int) -> bool: ...
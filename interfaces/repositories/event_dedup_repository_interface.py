@@ -0,0 +1,8 @@
+from abc import ABC, abstractmethod
+
+class IEventDedupRepository(ABC):
+    @abstractmethod
+    async def mark_if_new(self, event_id: str) -> bool: ...
+
+    @abstractmethod
+    async def forget(self, event_id: str): ...
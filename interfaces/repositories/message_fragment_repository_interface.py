@@ -1,11 +1,35 @@
 from abc import ABC, abstractmethod
-from typing import List, Any
+from typing import List, Any, Optional
 
 class IMessageFragmentRepository(ABC):
     @abstractmethod
     async def add_fragment(self, key: str, fragment: Any): ...
     
     @abstractmethod
-    async def get_and_clear_fragments(self, key: str) -> List[str]: ...
+    async def get_and_clear_fragments(self, key: str, pending_prefix: Optional[str] = None, stale_before: float = 0.0) -> Optional[List[str]]: ...
+
+    @abstractmethod
+    async def resolve_fragment(self, key: str, match_prefix: str, value: str) -> bool: ...
+
+    @abstractmethod
+    async def schedule_flush(self, key: str, member: str, deadline: float, keep_existing: bool = False): ...
+
+    @abstractmethod
+    async def claim_due_flushes(self, key: str, now: float, limit: int) -> List[str]: ...
+
+    @abstractmethod
+    async def get_flush_window(self, key: str) -> Optional[float]: ...
+
+    @abstractmethod
+    async def set_flush_window(self, key: str, window: float, ttl_seconds: int): ...
+
+    @abstractmethod
+    async def acquire_lane(self, key: str, token: str, ttl_seconds: int) -> bool: ...
+
+    @abstractmethod
+    async def extend_lane(self, key: str, token: str, ttl_seconds: int) -> bool: ...
+
+    @abstractmethod
+    async def release_lane(self, key: str, token: str) -> bool: ...
 
     async def delete_queue(self, key: str): ...
\ No newline at end of file
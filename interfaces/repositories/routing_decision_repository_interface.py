@@ -0,0 +1,9 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+
+class IRoutingDecisionRepository(ABC):
+    @abstractmethod
+    async def log_decision(self, text: str, decision: str, source: str) -> bool: ...
+
+    @abstractmethod
+    async def load_training_set(self, limit: int) -> List[Dict[str, Any]]: ...
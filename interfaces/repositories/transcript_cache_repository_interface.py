@@ -0,0 +1,9 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+class ITranscriptCacheRepository(ABC):
+    @abstractmethod
+    async def get_transcript(self, media_hash: str) -> Optional[str]: ...
+
+    @abstractmethod
+    async def save_transcript(self, media_hash: str, transcript: str): ...
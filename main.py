@@ -3,16 +3,28 @@ from controllers.message_process_controller import MessageProcessController
 from services.group_autorization_service import GroupAuthorizationService 
 from services.message_send_service import MessageSendService
 from services.media_processor_service import MediaProcessorService
+from services.media_handlers.audio_media_handler import AudioMediaHandler
+from services.media_handlers.image_media_handler import ImageMediaHandler
+from services.media_handlers.video_media_handler import VideoMediaHandler
+from services.media_handlers.document_media_handler import DocumentMediaHandler
 from services.crypto.wpp_decoder import Decoder
 from clients.calendar_client import GCalendarClient
+from clients.media_downloader import MediaDownloader
 from services.media_processor_service import MediaProcessorService
 from services.message_queue_service import MessageQueueService
+from services.turn_scheduler_service import TurnSchedulerService
+from services.context_window_service import ContextWindowService
+from services.intent_router_service import IntentRouterService
+from services.media_pipeline_service import MediaPipelineService
 from container.repositories import RepositoryContainer 
 from utils.logger import configure_logging, logger
+from utils.metrics import metrics
 from container.clients import ClientContainer 
 from container.agents import AgentContainer
-from fastapi.responses import JSONResponse
+from utils.json_response import FastJSONResponse as JSONResponse
+from utils import json_codec
 from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import uvicorn
 import os
@@ -67,21 +79,45 @@ class AppContainer:
         self.message_gen_service = MessageSendService(
             chat_client=self.client_container.get_client("IChat")
         )
+        self.intent_router = IntentRouterService(
+            decision_repository=self.repo_container.routing,
+            agent_ids=[agent.id for agent in self.agent_container.all()]
+        )
         self.orchestrator = ResponseOrchestratorService(
             agent_container=self.agent_container,
             ai_client=self.client_container.get_client("IAI"),
-            message_generation_service=self.message_gen_service
+            message_generation_service=self.message_gen_service,
+            intent_router=self.intent_router,
+            context_repository=self.repo_container.context
         )
         decoder_instance = Decoder() 
-        self.media_service = MediaProcessorService(
-            ai_client=self.client_container.get_client("IAI"),
-            decoder=decoder_instance
-        )
+        self.media_downloader = MediaDownloader()
+        media_handler_deps = {
+            "downloader": self.media_downloader,
+            "decoder": decoder_instance,
+            "result_cache": self.repo_container.transcripts,
+        }
+        ai_client = self.client_container.get_client("IAI")
+        self.media_service = MediaProcessorService(handlers=[
+            AudioMediaHandler(ai_client=ai_client, **media_handler_deps),
+            ImageMediaHandler(ai_client=ai_client, **media_handler_deps),
+            VideoMediaHandler(ai_client=ai_client, **media_handler_deps),
+            DocumentMediaHandler(**media_handler_deps),
+        ])
 
+        self.turn_scheduler = TurnSchedulerService(token_bucket=self.client_container.cache)
         self.queue_service = MessageQueueService(
             orchestrator=self.orchestrator,
             context_repository=self.repo_container.context,  
-            fragment_repository=self.client_container.cache
+            fragment_repository=self.client_container.cache,
+            turn_scheduler=self.turn_scheduler,
+            context_window=ContextWindowService(ai_client=self.client_container.get_client("IAI"))
+        )
+        
+        self.media_pipeline = MediaPipelineService(
+            media_service=self.media_service,
+            queue_service=self.queue_service,
+            job_queue=self.client_container.cache
         )
         
         self.auth_service = GroupAuthorizationService(
@@ -92,22 +128,40 @@ class AppContainer:
         self.message_controller = MessageProcessController(
             message_service=self.queue_service,
             media_service=self.media_service,
-            group_auth_service=self.auth_service
+            group_auth_service=self.auth_service,
+            media_pipeline=self.media_pipeline,
+            event_dedup=self.repo_container.events
         )
         logger.info("Container da Aplicação inicializado com sucesso.")
 
 #--------------------------------------------------------------------------------------------------------------------#
 
-app = FastAPI()
-container = AppContainer()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await container.queue_service.start()
+    await container.media_pipeline.start()
+    await container.intent_router.start()
+    yield
+    await container.intent_router.cleanup()
+    await container.media_pipeline.cleanup()
+    await container.media_downloader.close()
+    await container.queue_service.cleanup()
+    await container.turn_scheduler.cleanup()
+    ai_client = container.client_container.get_client("IAI")
+    if ai_client.transcription_engine:
+        ai_client.transcription_engine.shutdown()
+
+app = FastAPI(lifespan=lifespan, default_response_class=JSONResponse)
+# Processos 'spawn' (pool do Whisper) reimportam este módulo como __mp_main__ ao rodar `python main.py`.
+if __name__ != "__mp_main__":
+    container = AppContainer()
 
 #--------------------------------------------------------------------------------------------------------------------#
 
 @app.post("/messages-upsert")
 async def handle_webhook(request: Request):
     try:
-        data = await request.json()
-        logger.info(data)
+        data = json_codec.loads(await request.body())
     except Exception as e:
         logger.error(f"[Main]Erro ao decodificar JSON do webhook: {e}")
         return JSONResponse(content={"status": "error", "detail": "Invalid JSON body"}, status_code=400)
@@ -123,12 +177,42 @@ async def handle_webhook(request: Request):
 
 #--------------------------------------------------------------------------------------------------------------------#
 
+@app.post("/messages-upsert/batch")
+async def handle_webhook_batch(request: Request):
+    try:
+        data = json_codec.loads(await request.body())
+    except Exception as e:
+        logger.error(f"[Main]Erro ao decodificar JSON do lote: {e}")
+        return JSONResponse(content={"status": "error", "detail": "Invalid JSON body"}, status_code=400)
+    # Aceita uma lista de eventos ou um envelope único com 'data' em lista.
+    if isinstance(data, dict) and isinstance(data.get("data"), list):
+        data = [{**data, "data": item} for item in data["data"]]
+    if not isinstance(data, list) or not data:
+        return JSONResponse(content={"status": "error", "detail": "Esperada uma lista de eventos."}, status_code=400)
+    try:
+        response_data, status_code = await container.message_controller.control_batch(
+            [event for event in data if isinstance(event, dict)]
+        )
+        return JSONResponse(content=response_data, status_code=status_code)
+
+    except Exception as e:
+        logger.error(f"[Main] Erro não tratado ao processar lote do webhook: {e}", exc_info=True)
+        return JSONResponse(content={"status": "error", "detail": "Erro interno do servidor."}, status_code=500)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
 @app.get("/")
 async def root():
     return {"message": "Servidor FastAPI está online."}
 
 #--------------------------------------------------------------------------------------------------------------------#
 
+@app.get("/metrics")
+async def get_metrics():
+    return {"scheduler": container.turn_scheduler.stats(), **metrics.snapshot()}
+
+#--------------------------------------------------------------------------------------------------------------------#
+
 if __name__ == "__main__":
     logger.info("[Main]Iniciando servidor Uvicorn diretamente...")
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,113 @@
+from interfaces.repositories.context_repository_interface import IContextRepository
+from interfaces.clients.queue_interface import IQueue
+from repositories.context_repository import ContextRepository
+from utils.metrics import metrics
+from utils.logger import logger
+from utils import json_codec
+from typing import Any, Optional
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+class CachedContextRepository(IContextRepository):
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Cache write-through (Redis, compartilhado entre workers) na frente do ContextRepository:
+    conversas ativas leem o contexto do cache e só escrevem no Mongo. Se a escrita no Mongo
+    falhar, a entrada fica apagada e a próxima leitura volta à fonte.
+    """
+
+    _KEY_PREFIX = "context:"
+
+    def __init__(self, context_repository: ContextRepository, cache_client: IQueue):
+        self.TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "1800"))
+        self.repository = context_repository
+        self.cache = cache_client
+        logger.info(f"[CachedContextRepository] Inicializado (TTL {self.TTL_SECONDS}s).")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def get_context(self, phone: str) -> Optional[dict[str, Any]]:
+        cached = await self._read_cache(phone)
+        if cached is not None:
+            metrics.increment("context_cache.hit")
+            return cached
+        metrics.increment("context_cache.miss")
+        context_data = await self.repository.get_context(phone)
+        if context_data is not None:
+            await self._write_cache(phone, context_data)
+        return context_data
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def save_context(self, phone: str, context: dict[str, Any]) -> bool:
+        # O lane por telefone garante um único escritor por vez. A entrada é apagada ANTES da escrita no Mongo:
+        # se qualquer passo seguinte falhar, a próxima leitura volta à fonte em vez de ver um contexto velho.
+        cached = await self._read_cache(phone)
+        await self.invalidate(phone)
+        saved = await self.repository.save_context(phone, context)
+        if not saved or cached is None:
+            return saved
+        updated = {**cached, **context, "phone": phone}
+        if "history" in context:
+            updated["history"] = self.repository.window_history(phone, context["history"])
+        await self._write_cache(phone, updated)
+        return saved
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def append_messages(self, phone: str, messages: list[dict[str, Any]], extra: Optional[dict[str, Any]] = None) -> bool:
+        cached = await self._read_cache(phone)
+        await self.invalidate(phone)
+        saved = await self.repository.append_messages(phone, messages, extra)
+        if not saved or cached is None:
+            return saved
+        updated = {**cached, **(extra or {}), "phone": phone}
+        updated["history"] = self.repository.window_history(phone, cached.get("history", []) + messages)
+        await self._write_cache(phone, updated)
+        return saved
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def compact_history(self, phone: str, memory: str, keep_last: int) -> bool:
+        cached = await self._read_cache(phone)
+        await self.invalidate(phone)
+        saved = await self.repository.compact_history(phone, memory, keep_last)
+        if not saved or cached is None:
+            return saved
+        history = cached.get("history", [])
+        # Mesmo corte do $slice no Mongo, seguido da mesma janela aplicada na leitura da fonte.
+        kept = history[-keep_last:] if keep_last > 0 else []
+        updated = {**cached, "memory": memory, "history": self.repository.window_history(phone, kept)}
+        await self._write_cache(phone, updated)
+        return saved
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def invalidate(self, phone: str):
+        await self.cache.delete_queue(self._get_key(phone))
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _read_cache(self, phone: str) -> Optional[dict[str, Any]]:
+        raw = await self.cache.get_value(self._get_key(phone))
+        if not raw:
+            return None
+        try:
+            return json_codec.loads(raw)
+        except ValueError:
+            logger.warning(f"[CachedContextRepository] Entrada de cache corrompida para {phone}. Ignorando.")
+            return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _write_cache(self, phone: str, context_data: dict[str, Any]):
+        await self.cache.set_value(
+            self._get_key(phone),
+            json_codec.dumps(context_data, default=str),
+            ttl_seconds=self.TTL_SECONDS
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _get_key(self, phone: str) -> str:
+        return f"{self._KEY_PREFIX}{phone}"
@@ -2,22 +2,27 @@ from interfaces.repositories.context_repository_interface import IContextReposit
 from clients.mongo_client import MongoDBClient
 from utils.logger import logger
 from typing import Any, Optional
+import os
 
 class ContextRepository(IContextRepository):
     
     _COLLECTION_NAME = "user_contexts"
-    _HISTORY_LIMIT = 10 
 
     def __init__(self, db_client: MongoDBClient):
         self.db = db_client
+        # Janela guardada no documento ($slice no $push); o corte por tokens é feito no ContextWindowService.
+        self.STORED_HISTORY_LIMIT = int(os.getenv("CONTEXT_STORED_HISTORY_LIMIT", "50"))
         logger.info("[ContextRepository] Inicializado.")
 
     async def get_context(self, phone: str) -> Optional[dict[str, Any]]:
-        logger.info(f"[ContextRepository] Buscando contexto para {phone} (limit: {self._HISTORY_LIMIT})...")
+        logger.info(f"[ContextRepository] Buscando contexto para {phone} (limit: {self.STORED_HISTORY_LIMIT})...")
         filter = {"phone": phone}
         projection = {
             "phone": 1, 
-            "history": {"$slice": -self._HISTORY_LIMIT} 
+            "history": {"$slice": -self.STORED_HISTORY_LIMIT},
+            "debounce": 1,
+            "memory": 1,
+            "active_agent": 1
         }
         context_data = await self.db.find_one(
             self._COLLECTION_NAME, 
@@ -28,33 +33,70 @@ class ContextRepository(IContextRepository):
             context_data.pop("_id", None)
             history = context_data.get("history", [])
             if history:
-                first_valid_index = 0
-                for i, msg in enumerate(history):
-                    if msg.get("role") != "tool":
-                        first_valid_index = i
-                        break
-                    else:
-                        if i == 0:
-                            first_valid_index = -1 
-                if first_valid_index > 0:
-                    logger.warning(f"Contexto para {phone} continha 'tool' messages órfãs. Removendo as {first_valid_index} primeiras mensagens.")
-                    context_data["history"] = history[first_valid_index:]
-                elif first_valid_index == -1:
-                     logger.warning(f"Contexto para {phone} continha apenas 'tool' messages. Retornando histórico vazio.")
-                     context_data["history"] = []
-
+                context_data["history"] = self.window_history(phone, history)
             return context_data
         return None
 
-    async def save_context(self, phone: str, context: dict[str, Any]):
+    def window_history(self, phone: str, history: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Janela das últimas mensagens, sem 'tool' órfãs no início (o tool_call correspondente ficou fora do corte)."""
+        # Documentos antigos ainda podem ter prompts de sistema gravados no histórico.
+        history = [msg for msg in history if msg.get("role") != "system"][-self.STORED_HISTORY_LIMIT:]
+        first_valid_index = 0
+        for i, msg in enumerate(history):
+            if msg.get("role") != "tool":
+                first_valid_index = i
+                break
+            else:
+                if i == 0:
+                    first_valid_index = -1 
+        if first_valid_index > 0:
+            logger.warning(f"Contexto para {phone} continha 'tool' messages órfãs. Removendo as {first_valid_index} primeiras mensagens.")
+            return history[first_valid_index:]
+        elif first_valid_index == -1:
+             logger.warning(f"Contexto para {phone} continha apenas 'tool' messages. Retornando histórico vazio.")
+             return []
+        return history
+
+    async def save_context(self, phone: str, context: dict[str, Any]) -> bool:
         logger.info(f"[ContextRepository] Salvando contexto para {phone}...")
         filter = {"phone": phone}
         context_data_to_save = context.copy()
         context_data_to_save["phone"] = phone 
         
-        await self.db.update_one(
+        result = await self.db.update_one(
             self._COLLECTION_NAME, 
             filter, 
             context_data_to_save, 
             upsert=True
-        )
\ No newline at end of file
+        )
+        return result is not None
+
+    async def append_messages(self, phone: str, messages: list[dict[str, Any]], extra: Optional[dict[str, Any]] = None) -> bool:
+        """Grava só as mensagens novas do turno ($push/$each/$slice); prompts de sistema nunca são persistidos."""
+        new_messages = [msg for msg in messages if msg.get("role") != "system"]
+        logger.info(f"[ContextRepository] Anexando {len(new_messages)} mensagens ao contexto de {phone}...")
+        if not new_messages and not extra:
+            return True
+        result = await self.db.push_to_array(
+            self._COLLECTION_NAME,
+            {"phone": phone},
+            field="history",
+            items=new_messages,
+            slice_limit=self.STORED_HISTORY_LIMIT,
+            set_data={**(extra or {}), "phone": phone},
+            upsert=True
+        )
+        return result is not None
+
+    async def compact_history(self, phone: str, memory: str, keep_last: int) -> bool:
+        """Troca os turnos antigos pela memória resumida: mantém só as últimas `keep_last` mensagens."""
+        logger.info(f"[ContextRepository] Compactando contexto de {phone} (mantendo {keep_last} mensagens)...")
+        result = await self.db.push_to_array(
+            self._COLLECTION_NAME,
+            {"phone": phone},
+            field="history",
+            items=[],
+            slice_limit=keep_last,
+            set_data={"memory": memory}
+        )
+        return result is not None
@@ -0,0 +1,34 @@
+from interfaces.repositories.event_dedup_repository_interface import IEventDedupRepository
+from interfaces.clients.queue_interface import IQueue
+from utils.metrics import metrics
+from utils.logger import logger
+import time
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+class EventDedupRepository(IEventDedupRepository):
+#--------------------------------------------------------------------------------------------------------------------#
+    """Idempotência do webhook: cada evento (data.key.id) é aceito uma única vez dentro do TTL."""
+
+    _KEY_PREFIX = "webhook:event:"
+
+    def __init__(self, cache_client: IQueue):
+        self.TTL_SECONDS = int(os.getenv("WEBHOOK_DEDUP_TTL_SECONDS", "600"))
+        self.cache = cache_client
+        logger.info(f"[EventDedupRepository] Inicializado (TTL {self.TTL_SECONDS}s).")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def mark_if_new(self, event_id: str) -> bool:
+        created = await self.cache.set_if_absent(f"{self._KEY_PREFIX}{event_id}", time.time(), self.TTL_SECONDS)
+        if created is None:
+            # Redis indisponível: melhor processar um duplicado do que perder a mensagem.
+            metrics.increment("webhook.dedup_unavailable")
+            logger.warning(f"[EventDedupRepository] Não foi possível verificar o evento {event_id}. Processando mesmo assim.")
+            return True
+        return created
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def forget(self, event_id: str):
+        await self.cache.delete_queue(f"{self._KEY_PREFIX}{event_id}")
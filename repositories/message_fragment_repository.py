@@ -1,8 +1,7 @@
 from interfaces.repositories.message_fragment_repository_interface import IMessageFragmentRepository
 from clients.redis_client import RedisClient
 from utils.logger import logger
-from typing import Any
-import json
+from typing import Any, Optional
 
 #--------------------------------------------------------------------------------------------------------------------#
 class MessageFragmentRepository(IMessageFragmentRepository):
@@ -20,21 +19,56 @@ class MessageFragmentRepository(IMessageFragmentRepository):
 
 #--------------------------------------------------------------------------------------------------------------------#
 
-    async def get_and_clear_fragments(self, key: str) -> list[Any]:
+    async def get_and_clear_fragments(self, key: str, pending_prefix: Optional[str] = None, stale_before: float = 0.0) -> Optional[list[str]]:
         logger.info(f"[MessageFragmentRepository] Buscando e limpando fragmentos da chave {key}...")
-        fragments_str = await self.cache.get_queue_fragments(key)
-        if not fragments_str:
-            return []
-        await self.cache.delete_queue(key)
-        fragments_str.reverse()
-        fragments_deserialized = []
-        for frag in fragments_str:
-            try:
-                fragments_deserialized.append(json.loads(frag))
-            except json.JSONDecodeError:
-                fragments_deserialized.append(frag) 
-        logger.info(f"[MessageFragmentRepository] {len(fragments_deserialized)} fragmentos processados para {key}.")
-        return fragments_deserialized
+        fragments = await self.cache.drain_queue(key, pending_prefix=pending_prefix, stale_before=stale_before)
+        if fragments is None:
+            logger.info(f"[MessageFragmentRepository] {key} ainda tem mídia pendente. Nada foi drenado.")
+            return None
+        logger.info(f"[MessageFragmentRepository] {len(fragments)} fragmentos processados para {key}.")
+        return fragments
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def resolve_fragment(self, key: str, match_prefix: str, value: str) -> bool:
+        return await self.cache.replace_in_queue(key, match_prefix, value)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def schedule_flush(self, key: str, member: str, deadline: float, keep_existing: bool = False):
+        logger.debug(f"[MessageFragmentRepository] Agendando flush de {member} em {key}...")
+        await self.cache.schedule_deadline(key, member, deadline, keep_existing=keep_existing)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def claim_due_flushes(self, key: str, now: float, limit: int) -> list[str]:
+        return await self.cache.claim_expired(key, now, limit)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def get_flush_window(self, key: str) -> Optional[float]:
+        value = await self.cache.get_value(key)
+        return float(value) if value else None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def set_flush_window(self, key: str, window: float, ttl_seconds: int):
+        await self.cache.set_value(key, window, ttl_seconds=ttl_seconds)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def acquire_lane(self, key: str, token: str, ttl_seconds: int) -> bool:
+        return await self.cache.acquire_lock(key, token, ttl_seconds)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def extend_lane(self, key: str, token: str, ttl_seconds: int) -> bool:
+        return await self.cache.extend_lock(key, token, ttl_seconds)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def release_lane(self, key: str, token: str) -> bool:
+        return await self.cache.release_lock(key, token)
 
 #--------------------------------------------------------------------------------------------------------------------#
 
@@ -0,0 +1,40 @@
+from interfaces.repositories.routing_decision_repository_interface import IRoutingDecisionRepository
+from clients.mongo_client import MongoDBClient
+from utils.logger import logger
+from typing import Any
+import time
+
+#--------------------------------------------------------------------------------------------------------------------#
+class RoutingDecisionRepository(IRoutingDecisionRepository):
+#--------------------------------------------------------------------------------------------------------------------#
+    """Decisões do roteador LLM (texto do usuário -> agente/trivial), usadas para treinar o roteador local."""
+
+    _COLLECTION_NAME = "routing_decisions"
+    _MAX_TEXT_CHARS = 1000
+
+    def __init__(self, db_client: MongoDBClient):
+        self.db = db_client
+        logger.info("[RoutingDecisionRepository] Inicializado.")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def log_decision(self, text: str, decision: str, source: str) -> bool:
+        result = await self.db.insert_one(self._COLLECTION_NAME, {
+            "text": text[:self._MAX_TEXT_CHARS],
+            "decision": decision,
+            "source": source,
+            "created_at": time.time(),
+        })
+        return result is not None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def load_training_set(self, limit: int) -> list[dict[str, Any]]:
+        # Só rótulos do LLM: decisões do próprio fast-path reforçariam os erros dele.
+        return await self.db.find_many(
+            self._COLLECTION_NAME,
+            {"source": "llm"},
+            projection={"_id": 0, "text": 1, "decision": 1},
+            sort=[("created_at", -1)],
+            limit=limit
+        )
@@ -0,0 +1,59 @@
+from interfaces.repositories.transcript_cache_repository_interface import ITranscriptCacheRepository
+from interfaces.clients.queue_interface import IQueue
+from utils.metrics import metrics
+from utils.logger import logger
+from typing import Optional
+import time
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+class TranscriptCacheRepository(ITranscriptCacheRepository):
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Cache de transcrições no Redis, chaveado pelo fileSha256 da mídia: encaminhamentos e
+    reentregas do webhook com o mesmo arquivo não passam de novo por download e Whisper.
+    """
+
+    _KEY_PREFIX = "transcript:"
+    _INDEX_KEY = "transcript:index"
+
+    def __init__(self, cache_client: IQueue):
+        self.TTL_SECONDS = int(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+        self.MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "50000"))
+        self.MAX_ENTRY_CHARS = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRY_CHARS", "20000"))
+        self.cache = cache_client
+        logger.info(
+            f"[TranscriptCacheRepository] Inicializado (TTL {self.TTL_SECONDS}s, "
+            f"máx. {self.MAX_ENTRIES} entradas de até {self.MAX_ENTRY_CHARS} caracteres)."
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def get_transcript(self, media_hash: str) -> Optional[str]:
+        transcript = await self.cache.get_value(f"{self._KEY_PREFIX}{media_hash}")
+        metrics.increment(f"transcript_cache.{'hit' if transcript is not None else 'miss'}")
+        hits = metrics.get_counter("transcript_cache.hit")
+        total = hits + metrics.get_counter("transcript_cache.miss")
+        metrics.set_gauge("transcript_cache.hit_rate", round(hits / total, 4))
+        if transcript is not None:
+            logger.info(f"[TranscriptCacheRepository] Transcrição em cache para a mídia {media_hash[:12]}...")
+        return transcript
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def save_transcript(self, media_hash: str, transcript: str):
+        if len(transcript) > self.MAX_ENTRY_CHARS:
+            metrics.increment("transcript_cache.skipped_too_large")
+            return
+        now = time.time()
+        await self.cache.set_value(f"{self._KEY_PREFIX}{media_hash}", transcript, ttl_seconds=self.TTL_SECONDS)
+        evicted = await self.cache.track_in_index(
+            index_key=self._INDEX_KEY,
+            member=media_hash,
+            score=now,
+            max_members=self.MAX_ENTRIES,
+            min_score=now - self.TTL_SECONDS,
+            value_prefix=self._KEY_PREFIX,
+        )
+        if evicted:
+            metrics.increment("transcript_cache.evicted", evicted)
@@ -0,0 +1,208 @@
+from interfaces.clients.ia_interface import IAI
+from utils.metrics import metrics
+from utils.logger import logger
+from utils import json_codec
+from typing import Any, Optional
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+class ContextWindowService:
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Monta a janela de histórico enviada ao LLM sob um orçamento de tokens por modelo (não por nº de mensagens).
+    Um assistant com `tool_calls` e as respostas `tool` correspondentes formam uma unidade indivisível.
+    Turnos antigos que não cabem mais no orçamento são resumidos numa memória contínua (mensagem de
+    sistema com name="memory"), gravada no documento de contexto.
+    """
+
+    MEMORY_MESSAGE_NAME = "memory"
+    _CHARS_PER_TOKEN = 4
+    _MESSAGE_OVERHEAD_TOKENS = 4
+    _MODEL_TOKEN_BUDGETS: dict[str, int] = {
+        "gpt-4-turbo": 4000,
+        "gpt-4.1-mini": 6000,
+        "gpt-4o-mini": 6000,
+    }
+    _SUMMARY_INSTRUCTIONS = (
+        "Você mantém a memória de longo prazo de uma conversa no WhatsApp. Atualize o resumo existente com as "
+        "mensagens novas: preserve fatos sobre o usuário, preferências, decisões, compromissos e pendências; "
+        "descarte cumprimentos e detalhes irrelevantes. Responda apenas com o resumo atualizado, em português, "
+        "em no máximo {MAX_WORDS} palavras."
+    )
+
+    def __init__(self, ai_client: IAI):
+        self.DEFAULT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+        self.MAX_TOOL_OUTPUT_TOKENS = int(os.getenv("CONTEXT_MAX_TOOL_OUTPUT_TOKENS", "1200"))
+        self.SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "gpt-4o-mini")
+        self.SUMMARY_TRIGGER_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TRIGGER_TOKENS", "1500"))
+        self.SUMMARY_MAX_WORDS = int(os.getenv("CONTEXT_SUMMARY_MAX_WORDS", "200"))
+        self.ai = ai_client
+        logger.info(
+            f"[ContextWindowService] Inicializado. Orçamento padrão: {self.DEFAULT_TOKEN_BUDGET} tokens, "
+            f"resumo com '{self.SUMMARY_MODEL}' a partir de {self.SUMMARY_TRIGGER_TOKENS} tokens excedentes."
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def budget_for(self, model: Optional[str]) -> int:
+        env_budget = os.getenv(f"CONTEXT_TOKEN_BUDGET_{(model or '').upper().replace('-', '_').replace('.', '_')}")
+        if env_budget:
+            return int(env_budget)
+        return self._MODEL_TOKEN_BUDGETS.get(model or "", self.DEFAULT_TOKEN_BUDGET)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def estimate_tokens(self, message: dict[str, Any]) -> int:
+        chars = len(str(message.get("content") or ""))
+        for tool_call in message.get("tool_calls") or []:
+            function = tool_call.get("function", {})
+            chars += len(function.get("name", "")) + len(function.get("arguments", ""))
+        return chars // self._CHARS_PER_TOKEN + self._MESSAGE_OVERHEAD_TOKENS
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def build_window(
+        self,
+        history: list[dict[str, Any]],
+        memory: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> list[dict[str, Any]]:
+        """Janela final: [memória] + unidades mais recentes que cabem no orçamento (a última sempre entra)."""
+        budget = self.budget_for(model)
+        memory_message = self.memory_message(memory)
+        if memory_message:
+            budget -= self.estimate_tokens(memory_message)
+        kept_units, _ = self._split_by_budget(self._group_units(history), budget)
+        window = [msg for unit in kept_units for msg in unit]
+        window_tokens = sum(self.estimate_tokens(msg) for msg in window)
+        metrics.observe("context_window.tokens", window_tokens)
+        metrics.observe("context_window.messages", len(window))
+        if memory_message:
+            window.insert(0, memory_message)
+        return window
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def overflow(self, history: list[dict[str, Any]], model: Optional[str] = None) -> tuple[list[dict[str, Any]], int]:
+        """Mensagens que já não cabem na janela do próximo turno e quantas mensagens do fim continuam nela."""
+        kept_units, _ = self._split_by_budget(self._group_units(history), self.budget_for(model))
+        if not kept_units:
+            return list(history), 0
+        # A primeira mensagem de uma unidade nunca é 'tool' (truncada), então a identidade é preservada.
+        first_kept = kept_units[0][0]
+        start = next(index for index, msg in enumerate(history) if msg is first_kept)
+        return history[:start], len(history) - start
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def should_summarize(self, overflow_messages: list[dict[str, Any]]) -> bool:
+        return sum(self.estimate_tokens(msg) for msg in overflow_messages) >= self.SUMMARY_TRIGGER_TOKENS
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def summarize(self, memory: Optional[str], messages: list[dict[str, Any]]) -> Optional[str]:
+        """Funde `messages` na memória existente. Retorna None em caso de falha (o histórico fica intacto)."""
+        transcript = "\n".join(self._render_for_summary(msg) for msg in messages)
+        prompt = f"Resumo atual:\n{memory or '(vazio)'}\n\nMensagens novas:\n{transcript}"
+        try:
+            response = await self.ai.create_model_response(
+                model=self.SUMMARY_MODEL,
+                input_messages=[
+                    {"role": "system", "content": self._SUMMARY_INSTRUCTIONS.format(MAX_WORDS=self.SUMMARY_MAX_WORDS)},
+                    {"role": "user", "content": prompt},
+                ],
+            )
+            summary = (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            metrics.increment("context_window.summary_failed")
+            logger.error(f"[ContextWindowService] Falha ao resumir histórico: {e}", exc_info=True)
+            return None
+        if not summary:
+            metrics.increment("context_window.summary_failed")
+            return None
+        metrics.increment("context_window.summarized")
+        return summary
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def memory_message(self, memory: Optional[str]) -> Optional[dict[str, Any]]:
+        if not memory:
+            return None
+        return {
+            "role": "system",
+            "name": self.MEMORY_MESSAGE_NAME,
+            "content": f"Memória da conversa até aqui (turnos antigos resumidos):\n{memory}",
+        }
+
+    @classmethod
+    def is_memory_message(cls, message: dict[str, Any]) -> bool:
+        return message.get("role") == "system" and message.get("name") == cls.MEMORY_MESSAGE_NAME
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _group_units(self, history: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+        """Agrupa o histórico em unidades indivisíveis; 'tool' sem o tool_call correspondente são descartadas."""
+        units: list[list[dict[str, Any]]] = []
+        pending_call_ids: set[str] = set()
+        for msg in history:
+            role = msg.get("role")
+            if role == "system":
+                continue
+            if role == "tool":
+                if msg.get("tool_call_id") in pending_call_ids:
+                    pending_call_ids.discard(msg.get("tool_call_id"))
+                    units[-1].append(self._truncate_tool_output(msg))
+                continue
+            if pending_call_ids:
+                # Exchange incompleto (tool_call sem resposta): a API rejeitaria a janela.
+                units.pop()
+                pending_call_ids = set()
+            units.append([msg])
+            if role == "assistant" and msg.get("tool_calls"):
+                pending_call_ids = {tc.get("id") for tc in msg["tool_calls"]}
+        if pending_call_ids and units:
+            units.pop()
+        return units
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _split_by_budget(
+        self, units: list[list[dict[str, Any]]], budget: int
+    ) -> tuple[list[list[dict[str, Any]]], list[list[dict[str, Any]]]]:
+        used = 0
+        split_index = len(units)
+        for index in range(len(units) - 1, -1, -1):
+            unit_tokens = sum(self.estimate_tokens(msg) for msg in units[index])
+            if used + unit_tokens > budget and index < len(units) - 1:
+                break
+            used += unit_tokens
+            split_index = index
+        return units[split_index:], units[:split_index]
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _truncate_tool_output(self, message: dict[str, Any]) -> dict[str, Any]:
+        max_chars = self.MAX_TOOL_OUTPUT_TOKENS * self._CHARS_PER_TOKEN
+        content = str(message.get("content") or "")
+        if len(content) <= max_chars:
+            return message
+        metrics.increment("context_window.tool_output_truncated")
+        return {**message, "content": content[:max_chars] + " [...saída truncada]"}
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _render_for_summary(self, message: dict[str, Any]) -> str:
+        if message.get("tool_calls"):
+            calls = ", ".join(
+                f"{tc.get('function', {}).get('name')}({tc.get('function', {}).get('arguments', '')})"
+                for tc in message["tool_calls"]
+            )
+            return f"assistant chamou: {calls}"
+        content = message.get("content")
+        if not isinstance(content, str):
+            content = json_codec.dumps(content, default=str)
+        return f"{message.get('role')}: {self._clip(content)}"
+
+    def _clip(self, text: str) -> str:
+        max_chars = self.MAX_TOOL_OUTPUT_TOKENS * self._CHARS_PER_TOKEN
+        return text if len(text) <= max_chars else text[:max_chars] + " [...]"
@@ -1,9 +1,9 @@
-import io
 import hashlib
 import hmac
 import base64
-from typing import Optional
-from utils.logger import logger
+from typing import AsyncIterator, Optional
+from exceptions.media_exceptions import MediaIntegrityError
+from utils.metrics import metrics
 from Crypto.Cipher import AES
 
 #--------------------------------------------------------------------------------------------------------------------#
@@ -18,12 +18,8 @@ class Decoder:
         "audio/ogg": b"WhatsApp Audio Keys",
     }
     
-    _EXTENSAO: dict[str, str] = {
-        "image": "jpg",
-        "video": "mp4",
-        "audio": "ogg",
-        "document": "bin",
-    }
+    _TAMANHO_MAC = 10
+    _TAMANHO_BLOCO = 16
 
 #--------------------------------------------------------------------------------------------------------------------#
 
@@ -49,49 +45,62 @@ class Decoder:
     def _remover_padding_aes(dados: bytes) -> bytes:
         tamanho_padding = dados[len(dados) - 1]
         return dados[:-tamanho_padding]
-    
+
 #--------------------------------------------------------------------------------------------------------------------#
 
-    @staticmethod
-    def _descriptografar_aes(chave: bytes, texto_cifrado: bytes, iv: Optional[bytes]) -> bytes:
-        try:
-            cipher = AES.new(chave, AES.MODE_CBC, iv) 
-            texto_plano: bytes = cipher.decrypt(texto_cifrado)
-            return Decoder._remover_padding_aes(texto_plano)
-        except Exception as e:
-            raise ValueError(f"Erro na descriptografia AES: {e}")
-        
+    def _derivar_chaves(self, chave_midia_base64: str, mime_type: str, tipo_midia: Optional[str] = None) -> tuple[bytes, bytes, bytes]:
+        """Retorna (iv, chave AES, chave MAC) derivados da mediaKey."""
+        chave_midia_bytes: bytes = base64.b64decode(chave_midia_base64)
+        info_app = (
+            self._APP_INFO.get(tipo_midia or "")
+            or self._APP_INFO.get(mime_type)
+            or self._APP_INFO.get(mime_type.split("/")[0], self._APP_INFO["audio"])
+        )
+        chave_expandida: bytes = self._derivar_chave_hkdf(chave_midia_bytes, 112, info_app)
+        return chave_expandida[:16], chave_expandida[16:48], chave_expandida[48:80]
+
 #--------------------------------------------------------------------------------------------------------------------#
 
-    def decodificar_buffer(self, 
-                           buffer_criptografado: io.BytesIO, 
-                           chave_midia_base64: str, 
-                           mime_type: str) -> io.BytesIO:
-        try:
-            dados_midia: bytes = buffer_criptografado.getvalue()
-            chave_midia_bytes: bytes = base64.b64decode(chave_midia_base64)
+    def _verificar_mac(self, mac_calculado: bytes, mac_recebido: bytes):
+        if not hmac.compare_digest(mac_calculado[:self._TAMANHO_MAC], mac_recebido):
+            metrics.increment("media.integrity_failed")
+            raise MediaIntegrityError("MAC da mídia não confere (download corrompido ou truncado).")
+    
+#--------------------------------------------------------------------------------------------------------------------#
 
-            info_app = self._APP_INFO.get(mime_type, self._APP_INFO["audio"])
-            chave_expandida: bytes = self._derivar_chave_hkdf(chave_midia_bytes, 112, info_app)
-            
-            texto_cifrado: bytes = dados_midia[:-10]
-            
-            dados_decodificados: bytes = self._descriptografar_aes(
-                chave=chave_expandida[16:48], 
-                texto_cifrado=texto_cifrado, 
-                iv=chave_expandida[:16]
-            )
+    async def decodificar_stream(self,
+                                 chunks: AsyncIterator[bytes],
+                                 chave_midia_base64: str,
+                                 mime_type: str,
+                                 tipo_midia: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Descriptografa a mídia conforme os chunks chegam (AES-CBC incremental), emitindo texto plano
+        sem manter o arquivo cifrado inteiro em memória. Os últimos 10 bytes (MAC) e o último bloco
+        (padding) ficam retidos até o fim do stream, quando o HMAC é conferido: uma mídia inválida
+        levanta MediaIntegrityError antes de qualquer transcrição.
+        """
+        iv, chave_aes, chave_mac = self._derivar_chaves(chave_midia_base64, mime_type, tipo_midia)
+        cipher = AES.new(chave_aes, AES.MODE_CBC, iv)
+        mac = hmac.new(chave_mac, iv, hashlib.sha256)
+        retidos = self._TAMANHO_MAC + self._TAMANHO_BLOCO
+        pendente = bytearray()
 
-            buffer_decodificado = io.BytesIO(dados_decodificados)
-            
-            extensao = self._EXTENSAO.get(mime_type, mime_type.split("/")[-1])
-            buffer_decodificado.name = f"audio_decodificado.{extensao}"
-            buffer_decodificado.seek(0)
-            
-            return buffer_decodificado
+        async for chunk in chunks:
+            pendente += chunk
+            pronto = (len(pendente) - retidos) // self._TAMANHO_BLOCO * self._TAMANHO_BLOCO
+            if pronto <= 0:
+                continue
+            texto_cifrado = bytes(pendente[:pronto])
+            del pendente[:pronto]
+            mac.update(texto_cifrado)
+            yield cipher.decrypt(texto_cifrado)
 
-        except Exception as e:
-            logger.error(f"Falha crítica na decodificação da mídia: {e}")
-            raise RuntimeError("Não foi possível decodificar o áudio. Chave ou formato inválido.")
-        
-#--------------------------------------------------------------------------------------------------------------------#
\ No newline at end of file
+        if len(pendente) != retidos:
+            metrics.increment("media.integrity_failed")
+            raise MediaIntegrityError(f"Mídia truncada ou malformada ({len(pendente)} bytes finais).")
+        ultimo_bloco = bytes(pendente[:-self._TAMANHO_MAC])
+        mac.update(ultimo_bloco)
+        self._verificar_mac(mac.digest(), bytes(pendente[-self._TAMANHO_MAC:]))
+        yield self._remover_padding_aes(cipher.decrypt(ultimo_bloco))
+
+#--------------------------------------------------------------------------------------------------------------------#
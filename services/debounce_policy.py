@@ -0,0 +1,77 @@
+from typing import Any, Optional
+import math
+
+#--------------------------------------------------------------------------------------------------------------------#
+class AdaptiveDebouncePolicy:
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Aprende a distribuição dos intervalos entre fragmentos de cada telefone (média/variância
+    exponenciais) e escolhe uma janela de debounce por usuário.
+    """
+
+    DEFAULT_WINDOW_SECONDS = 8.0
+    MIN_WINDOW_SECONDS = 1.5
+    MAX_WINDOW_SECONDS = 15.0
+    MAX_GAP_SECONDS = 45.0
+    NEAR_MISS_SECONDS = 4.0
+    SAFETY_MARGIN_SECONDS = 0.5
+    MIN_SAMPLES = 3
+    ALPHA = 0.3
+
+    _COMPLETE_SOURCES = ("audio",)
+    _COMPLETE_ENDINGS = ("?",)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def looks_complete(self, message: str, source: str = "text") -> bool:
+        if source in self._COMPLETE_SOURCES:
+            return True
+        text = (message or "").strip()
+        return text.endswith(self._COMPLETE_ENDINGS)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def extract_gaps(self, arrivals: list[float], stats: Optional[dict[str, Any]]) -> list[float]:
+        """
+        Intervalos dentro do lote. O intervalo desde o último fragmento do lote anterior só entra
+        quando foi um "quase" (o fragmento perdeu a janela por pouco); sem isso a janela só
+        observaria intervalos menores que ela mesma e encolheria indefinidamente.
+        """
+        timeline = sorted(arrivals)
+        gaps = [b - a for a, b in zip(timeline, timeline[1:])]
+        last_arrival = (stats or {}).get("last_arrival")
+        if last_arrival is not None and timeline:
+            near_miss_limit = self.window_for(stats) + self.NEAR_MISS_SECONDS
+            cross_gap = timeline[0] - last_arrival
+            if cross_gap <= near_miss_limit:
+                gaps.insert(0, cross_gap)
+        return [gap for gap in gaps if 0 <= gap <= self.MAX_GAP_SECONDS]
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def update_stats(self, stats: Optional[dict[str, Any]], gaps: list[float], last_arrival: Optional[float]) -> dict[str, Any]:
+        updated = dict(stats or {})
+        mean = updated.get("gap_mean")
+        var = updated.get("gap_var", 0.0)
+        samples = updated.get("samples", 0)
+        for gap in gaps:
+            if mean is None:
+                mean, var = gap, 0.0
+            else:
+                diff = gap - mean
+                mean += self.ALPHA * diff
+                var = (1 - self.ALPHA) * (var + self.ALPHA * diff * diff)
+            samples += 1
+        updated.update({"gap_mean": mean, "gap_var": var, "samples": samples})
+        if last_arrival is not None:
+            updated["last_arrival"] = last_arrival
+        updated["window"] = self.window_for(updated)
+        return updated
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def window_for(self, stats: Optional[dict[str, Any]]) -> float:
+        if not stats or stats.get("samples", 0) < self.MIN_SAMPLES or stats.get("gap_mean") is None:
+            return self.DEFAULT_WINDOW_SECONDS
+        window = stats["gap_mean"] + 2 * math.sqrt(max(stats.get("gap_var", 0.0), 0.0)) + self.SAFETY_MARGIN_SECONDS
+        return round(min(max(window, self.MIN_WINDOW_SECONDS), self.MAX_WINDOW_SECONDS), 2)
\ No newline at end of file
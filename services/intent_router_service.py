@@ -0,0 +1,200 @@
+from interfaces.repositories.routing_decision_repository_interface import IRoutingDecisionRepository
+from dataclasses import dataclass
+from collections import Counter
+from utils.metrics import metrics
+from utils.logger import logger
+from typing import Any, Optional
+import unicodedata
+import asyncio
+import math
+import re
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+@dataclass
+class RoutingDecision:
+    agent_id: Optional[str]
+    reply: Optional[str]
+    confidence: float
+    source: str
+
+#--------------------------------------------------------------------------------------------------------------------#
+class IntentRouterService:
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Roteador local (fast-path) na frente do roteador LLM do orquestrador:
+    1. regras compiladas (saudações/agradecimentos respondidos na hora; agenda/pesquisa óbvias);
+    2. Naive Bayes multinomial em Python puro, treinado com as decisões registradas do roteador LLM.
+    Só devolve uma decisão quando a confiança é alta; caso contrário o LLM roteia (e a decisão vira treino).
+    """
+
+    TRIVIAL_LABEL = "trivial"
+    # Sem regra para "ok"/"certo"/"beleza": quase sempre respondem a uma pergunta do agente e precisam do histórico.
+    _TRIVIAL_RULES: list[tuple[re.Pattern, str]] = [
+        (re.compile(r"^(oi+e?|ola|opa|e ai|eai|ei|hey|hello|salve|bom dia|boa tarde|boa noite)( tudo (bem|bom|certo))?$"),
+         "Olá! Em que posso ajudar?"),
+        (re.compile(r"^((muito )?(obrigad[oa]|brigad[oa])( mesmo)?|obg|valeu|vlw|agradeco)$"),
+         "De nada! Qualquer coisa, é só chamar."),
+    ]
+    _AGENT_RULES: list[tuple[re.Pattern, str]] = [
+        (re.compile(r"\b(agend\w*|desmarc\w*|remarc\w*|agenda|calendario|compromissos?|reunia?o(es)?)\b"),
+         "agent_agendamento"),
+        (re.compile(r"\b(pesquis\w*|noticias?|busque|buscar|procure|procurar|resum[ae]\w*)\b"),
+         "agent_conteudo"),
+    ]
+    _TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+    _MAX_RULE_WORDS = 12
+
+    def __init__(self, decision_repository: IRoutingDecisionRepository, agent_ids: list[str]):
+        self.ENABLED = os.getenv("ROUTER_FAST_PATH", "on").lower() != "off"
+        self.MIN_CONFIDENCE = float(os.getenv("ROUTER_FAST_PATH_MIN_CONFIDENCE", "0.85"))
+        self.MIN_TRAINING_SAMPLES = int(os.getenv("ROUTER_MIN_TRAINING_SAMPLES", "200"))
+        self.TRAINING_SET_LIMIT = int(os.getenv("ROUTER_TRAINING_SET_LIMIT", "20000"))
+        self.RETRAIN_INTERVAL_SECONDS = float(os.getenv("ROUTER_RETRAIN_INTERVAL_SECONDS", "3600"))
+        self.decision_repository = decision_repository
+        self.agent_ids = set(agent_ids)
+        self._agent_rules = [(pattern, agent_id) for pattern, agent_id in self._AGENT_RULES if agent_id in self.agent_ids]
+        self._class_log_priors: dict[str, float] = {}
+        self._token_log_probs: dict[str, dict[str, float]] = {}
+        self._unknown_log_probs: dict[str, float] = {}
+        self._retrain_task: Optional[asyncio.Task] = None
+        logger.info(
+            f"[IntentRouterService] Inicializado ({'ativo' if self.ENABLED else 'desativado'}). "
+            f"Confiança mínima: {self.MIN_CONFIDENCE}."
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def start(self):
+        if not self.ENABLED or (self._retrain_task and not self._retrain_task.done()):
+            return
+        self._retrain_task = asyncio.create_task(self._retrain_loop())
+
+    async def cleanup(self):
+        if self._retrain_task:
+            self._retrain_task.cancel()
+            await asyncio.gather(self._retrain_task, return_exceptions=True)
+            self._retrain_task = None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def route(self, text: Optional[str]) -> Optional[RoutingDecision]:
+        """Decisão local para a última mensagem do usuário, ou None quando o LLM deve decidir."""
+        if not self.ENABLED or not text:
+            return None
+        normalized = self._normalize(text)
+        decision = self._match_rules(normalized)
+        if decision is None:
+            decision = self._classify(normalized)
+        if decision is None:
+            metrics.increment("router.fast_path.miss")
+            return None
+        metrics.increment(f"router.fast_path.{decision.source}")
+        return decision
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def record(self, text: Optional[str], decision: str):
+        """Registra uma decisão do roteador LLM como exemplo de treino."""
+        if not self.ENABLED or not text:
+            return
+        try:
+            await self.decision_repository.log_decision(text, decision, source="llm")
+        except Exception as e:
+            logger.warning(f"[IntentRouterService] Falha ao registrar decisão de roteamento: {e}")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _match_rules(self, normalized: str) -> Optional[RoutingDecision]:
+        for pattern, reply in self._TRIVIAL_RULES:
+            if pattern.match(normalized):
+                return RoutingDecision(agent_id=None, reply=reply, confidence=1.0, source="rule")
+        if len(normalized.split()) > self._MAX_RULE_WORDS:
+            # Mensagens longas costumam misturar assuntos; regras de palavra-chave erram mais.
+            return None
+        matched = {agent_id for pattern, agent_id in self._agent_rules if pattern.search(normalized)}
+        if len(matched) == 1:
+            return RoutingDecision(agent_id=matched.pop(), reply=None, confidence=1.0, source="rule")
+        return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _classify(self, normalized: str) -> Optional[RoutingDecision]:
+        if not self._class_log_priors:
+            return None
+        tokens = self._TOKEN_PATTERN.findall(normalized)
+        if not tokens:
+            return None
+        scores = {}
+        for label, log_prior in self._class_log_priors.items():
+            token_log_probs = self._token_log_probs[label]
+            unknown = self._unknown_log_probs[label]
+            scores[label] = log_prior + sum(token_log_probs.get(token, unknown) for token in tokens)
+        best_label = max(scores, key=scores.get)
+        best_score = scores[best_label]
+        confidence = 1.0 / sum(math.exp(score - best_score) for score in scores.values())
+        # Trivial sem regra não tem resposta pronta: deixa o LLM responder.
+        if confidence < self.MIN_CONFIDENCE or best_label not in self.agent_ids:
+            return None
+        return RoutingDecision(agent_id=best_label, reply=None, confidence=confidence, source="classifier")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def train(self) -> bool:
+        samples = await self.decision_repository.load_training_set(self.TRAINING_SET_LIMIT)
+        labeled = [
+            (self._TOKEN_PATTERN.findall(self._normalize(sample.get("text", ""))), sample.get("decision"))
+            for sample in samples
+            if sample.get("decision") in self.agent_ids or sample.get("decision") == self.TRIVIAL_LABEL
+        ]
+        labeled = [(tokens, label) for tokens, label in labeled if tokens]
+        if len(labeled) < self.MIN_TRAINING_SAMPLES:
+            logger.info(
+                f"[IntentRouterService] {len(labeled)} exemplos de roteamento (mínimo {self.MIN_TRAINING_SAMPLES}). "
+                "Classificador local desativado; só as regras estão ativas."
+            )
+            return False
+        class_counts: Counter = Counter(label for _, label in labeled)
+        token_counts: dict[str, Counter] = {label: Counter() for label in class_counts}
+        for tokens, label in labeled:
+            token_counts[label].update(tokens)
+        vocabulary_size = len({token for counts in token_counts.values() for token in counts})
+        # Laplace (add-one): token desconhecido para a classe não zera a probabilidade.
+        self._token_log_probs = {}
+        self._unknown_log_probs = {}
+        for label, counts in token_counts.items():
+            denominator = sum(counts.values()) + vocabulary_size
+            self._token_log_probs[label] = {token: math.log((count + 1) / denominator) for token, count in counts.items()}
+            self._unknown_log_probs[label] = math.log(1 / denominator)
+        self._class_log_priors = {label: math.log(count / len(labeled)) for label, count in class_counts.items()}
+        metrics.set_gauge("router.training_samples", len(labeled))
+        logger.info(f"[IntentRouterService] Classificador treinado com {len(labeled)} exemplos ({dict(class_counts)}).")
+        return True
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _retrain_loop(self):
+        while True:
+            try:
+                await self.train()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[IntentRouterService] Falha ao treinar o classificador: {e}", exc_info=True)
+            await asyncio.sleep(self.RETRAIN_INTERVAL_SECONDS)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        without_accents = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+        return " ".join(re.findall(r"[a-z0-9]+", without_accents.lower()))
+
+    @staticmethod
+    def last_user_text(context: list[dict[str, Any]]) -> Optional[str]:
+        for msg in reversed(context):
+            if msg.get("role") == "user":
+                content = msg.get("content")
+                return content if isinstance(content, str) else None
+        return None
@@ -0,0 +1,30 @@
+from services.media_handlers.base_media_handler import BaseMediaHandler
+from interfaces.clients.ia_interface import IAI
+from utils.logger import logger
+from typing import Any, Optional
+
+#--------------------------------------------------------------------------------------------------------------------#
+class AudioMediaHandler(BaseMediaHandler):
+#--------------------------------------------------------------------------------------------------------------------#
+
+    _DEFAULT_MAX_CONCURRENCY = 4
+
+    def __init__(self, ai_client: IAI, **kwargs):
+        self.ai_client = ai_client
+        super().__init__(**kwargs)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    def media_type(self) -> str:
+        return "audio"
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _extract_text(self, media: dict[str, Any], content: memoryview) -> Optional[str]:
+        logger.info("[AudioMediaHandler] Áudio descriptografado. Enviando para transcrição...")
+        transcricao = await self.ai_client.transcribe_audio(content)
+        if not transcricao or transcricao.startswith("[ERRO"):
+            return None
+        logger.info(f"[AudioMediaHandler] Transcrição concluída: {transcricao[:30]}...")
+        return transcricao
@@ -0,0 +1,105 @@
+from interfaces.repositories.transcript_cache_repository_interface import ITranscriptCacheRepository
+from exceptions.media_exceptions import MediaIntegrityError, MediaTooLargeError
+from clients.media_downloader import MediaDownloader
+from services.crypto.wpp_decoder import Decoder
+from utils.metrics import metrics
+from utils.logger import logger
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+import asyncio
+import httpx
+import io
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+class BaseMediaHandler(ABC):
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Handler de um tipo de mídia no pipeline: baixa e descriptografa (stream) e extrai um texto para o agente.
+    Cada tipo tem seu próprio limite de concorrência e de tamanho (MEDIA_<TIPO>_MAX_CONCURRENCY / _MAX_BYTES),
+    para que documentos grandes não tomem a vez das mensagens de voz.
+    """
+
+    _DEFAULT_MAX_CONCURRENCY = 2
+    _DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+    def __init__(
+        self,
+        downloader: MediaDownloader,
+        decoder: Decoder,
+        result_cache: Optional[ITranscriptCacheRepository] = None
+    ):
+        prefix = f"MEDIA_{self.media_type.upper()}"
+        self.MAX_CONCURRENCY = int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(self._DEFAULT_MAX_CONCURRENCY)))
+        self.MAX_BYTES = int(os.getenv(f"{prefix}_MAX_BYTES", str(self._DEFAULT_MAX_BYTES)))
+        self.downloader = downloader
+        self.decoder = decoder
+        self.result_cache = result_cache
+        self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+        logger.info(
+            f"[{type(self).__name__}] Inicializado (concorrência {self.MAX_CONCURRENCY}, limite {self.MAX_BYTES} bytes)."
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    @abstractmethod
+    def media_type(self) -> str: ...
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @abstractmethod
+    async def _extract_text(self, media: dict[str, Any], content: memoryview) -> Optional[str]: ...
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _format_result(self, text: Optional[str], media: dict[str, Any]) -> Optional[str]:
+        """Texto final entregue ao agente; handlers com legenda/nome de arquivo sobrescrevem."""
+        return text
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def handle(self, media: dict[str, Any]) -> Optional[str]:
+        media_hash = media.get('file_sha256')
+        if media_hash and self.result_cache:
+            cached = await self.result_cache.get_transcript(media_hash)
+            if cached is not None:
+                return self._format_result(cached, media)
+
+        text = None
+        try:
+            declared = int(media.get('file_length') or 0)
+            if declared > self.MAX_BYTES:
+                raise MediaTooLargeError(f"Mídia declara {declared} bytes (limite {self.MAX_BYTES}).")
+            async with self._semaphore:
+                content = await self._download(media)
+                text = await self._extract_text(media, content)
+
+        except (MediaIntegrityError, MediaTooLargeError) as e:
+            metrics.increment(f"media_handler.rejected.{self.media_type}")
+            logger.warning(f"[{type(self).__name__}] Mídia rejeitada: {e}")
+        except httpx.HTTPError as e:
+            logger.error(f"[{type(self).__name__}] Falha ao BAIXAR a mídia: {e}", exc_info=True)
+        except Exception as e:
+            logger.error(f"[{type(self).__name__}] Falha ao processar a mídia: {e}", exc_info=True)
+
+        if text and media_hash and self.result_cache:
+            await self.result_cache.save_transcript(media_hash, text)
+        return self._format_result(text, media)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _download(self, media: dict[str, Any]) -> memoryview:
+        logger.info(f"[{type(self).__name__}] Baixando e descriptografando (stream) de: {media['url'][:50]}...")
+        buffer = io.BytesIO()
+        async with self.downloader.open_stream(media['url'], max_bytes=self.MAX_BYTES) as chunks:
+            async for texto_plano in self.decoder.decodificar_stream(
+                chunks=chunks,
+                chave_midia_base64=media['media_key'],
+                mime_type=media['mimetype'],
+                tipo_midia=self.media_type
+            ):
+                buffer.write(texto_plano)
+        # getbuffer() expõe o buffer sem copiá-lo (getvalue() dobraria o pico de memória em vídeos grandes);
+        # os handlers repassam a view direto para a transcrição/visão.
+        return buffer.getbuffer()
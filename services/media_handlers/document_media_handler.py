@@ -0,0 +1,74 @@
+from services.media_handlers.base_media_handler import BaseMediaHandler
+from utils.logger import logger
+from typing import Any, Optional
+import asyncio
+import io
+import os
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+#--------------------------------------------------------------------------------------------------------------------#
+class DocumentMediaHandler(BaseMediaHandler):
+#--------------------------------------------------------------------------------------------------------------------#
+    """Extrai o texto de PDFs (pypdf, opcional) e arquivos de texto; outros formatos seguem só com nome/legenda."""
+
+    _DEFAULT_MAX_CONCURRENCY = 2
+    _DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.MAX_PAGES = int(os.getenv("MEDIA_DOCUMENT_MAX_PAGES", "30"))
+        self.MAX_CHARS = int(os.getenv("MEDIA_DOCUMENT_MAX_CHARS", "12000"))
+        if PdfReader is None:
+            logger.warning("[DocumentMediaHandler] 'pypdf' não instalado: texto de PDFs não será extraído.")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    def media_type(self) -> str:
+        return "document"
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _extract_text(self, media: dict[str, Any], content: memoryview) -> Optional[str]:
+        mime_type = (media.get('mimetype') or "").split(";")[0].strip()
+        if mime_type == "application/pdf":
+            if PdfReader is None:
+                return None
+            # pypdf é CPU-bound: roda fora do event loop.
+            return await asyncio.to_thread(self._extract_pdf_text, content)
+        if mime_type.startswith("text/"):
+            # UTF-8 usa no máximo 4 bytes por caractere: decodifica só o trecho que pode caber em MAX_CHARS.
+            return str(content[:self.MAX_CHARS * 4], "utf-8", errors="ignore")[:self.MAX_CHARS]
+        logger.info(f"[DocumentMediaHandler] Formato sem extração de texto: {mime_type}")
+        return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _extract_pdf_text(self, content: memoryview) -> Optional[str]:
+        reader = PdfReader(io.BytesIO(content))
+        partes: list[str] = []
+        total = 0
+        for page in reader.pages[:self.MAX_PAGES]:
+            texto = (page.extract_text() or "").strip()
+            if not texto:
+                continue
+            partes.append(texto)
+            total += len(texto)
+            if total >= self.MAX_CHARS:
+                break
+        return "\n".join(partes)[:self.MAX_CHARS] or None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _format_result(self, text: Optional[str], media: dict[str, Any]) -> Optional[str]:
+        nome = media.get('file_name') or "sem nome"
+        partes = [f"[Documento enviado: {nome}]"]
+        if text:
+            partes.append(f"Conteúdo do documento:\n{text.strip()}")
+        if media.get('caption'):
+            partes.append(f"Legenda: {media['caption']}")
+        return "\n".join(partes)
@@ -0,0 +1,43 @@
+from services.media_handlers.base_media_handler import BaseMediaHandler
+from interfaces.clients.ia_interface import IAI
+from utils.logger import logger
+from typing import Any, Optional
+
+#--------------------------------------------------------------------------------------------------------------------#
+class ImageMediaHandler(BaseMediaHandler):
+#--------------------------------------------------------------------------------------------------------------------#
+    """Descrição + OCR da imagem via modelo de visão, para o agente 'ver' o que foi enviado."""
+
+    _DEFAULT_MAX_CONCURRENCY = 4
+    _DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+    _PROMPT = (
+        "Descreva objetivamente esta imagem para um assistente que não pode vê-la. "
+        "Transcreva integralmente qualquer texto visível. Responda em português, sem introduções."
+    )
+
+    def __init__(self, ai_client: IAI, **kwargs):
+        self.ai_client = ai_client
+        super().__init__(**kwargs)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    def media_type(self) -> str:
+        return "image"
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _extract_text(self, media: dict[str, Any], content: memoryview) -> Optional[str]:
+        logger.info("[ImageMediaHandler] Imagem descriptografada. Enviando para o modelo de visão...")
+        descricao = await self.ai_client.describe_image(content, media['mimetype'], self._PROMPT)
+        return descricao or None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _format_result(self, text: Optional[str], media: dict[str, Any]) -> Optional[str]:
+        partes = ["[Imagem enviada]"]
+        if text:
+            partes.append(f"Conteúdo da imagem: {text.strip()}")
+        if media.get('caption'):
+            partes.append(f"Legenda: {media['caption']}")
+        return "\n".join(partes)
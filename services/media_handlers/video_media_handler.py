@@ -0,0 +1,89 @@
+from services.media_handlers.base_media_handler import BaseMediaHandler
+from interfaces.clients.ia_interface import IAI
+from utils.metrics import metrics
+from utils.logger import logger
+from typing import Any, Optional
+import tempfile
+import asyncio
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+class VideoMediaHandler(BaseMediaHandler):
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Transcreve a trilha de áudio do vídeo. O áudio é extraído aqui (ffmpeg lendo de arquivo temporário, já que
+    o MP4 do WhatsApp costuma ter o índice 'moov' no fim e não decodifica via pipe) e só ele segue para a
+    engine de transcrição, o que também mantém pequeno o job enviado ao worker remoto.
+    """
+
+    _DEFAULT_MAX_CONCURRENCY = 1
+    _DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, ai_client: IAI, **kwargs):
+        self.ai_client = ai_client
+        super().__init__(**kwargs)
+        self.MAX_AUDIO_SECONDS = int(os.getenv("MEDIA_VIDEO_MAX_AUDIO_SECONDS", "600"))
+        self.EXTRACT_TIMEOUT_SECONDS = float(os.getenv("MEDIA_VIDEO_EXTRACT_TIMEOUT_SECONDS", "120"))
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    def media_type(self) -> str:
+        return "video"
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _extract_text(self, media: dict[str, Any], content: memoryview) -> Optional[str]:
+        logger.info("[VideoMediaHandler] Vídeo descriptografado. Extraindo a trilha de áudio...")
+        audio = await self._extract_audio_track(content)
+        if not audio:
+            return None
+        metrics.observe("media_handler.video.audio_bytes", len(audio))
+        transcricao = await self.ai_client.transcribe_audio(audio)
+        if not transcricao or transcricao.startswith("[ERRO"):
+            return None
+        return transcricao
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _extract_audio_track(self, content: memoryview) -> Optional[bytes]:
+        """Áudio mono 16 kHz em Ogg/Opus, limitado a MAX_AUDIO_SECONDS. None se o vídeo não tiver áudio ou o ffmpeg falhar."""
+        fd, video_path = tempfile.mkstemp(suffix=".video")
+        try:
+            with os.fdopen(fd, "wb") as video_file:
+                await asyncio.to_thread(video_file.write, content)
+            process = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-nostdin", "-i", video_path,
+                "-vn", "-t", str(self.MAX_AUDIO_SECONDS),
+                "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "24k",
+                "-f", "ogg", "-loglevel", "error", "pipe:1",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                audio, stderr = await asyncio.wait_for(process.communicate(), self.EXTRACT_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                logger.error(f"[VideoMediaHandler] Extração de áudio excedeu {self.EXTRACT_TIMEOUT_SECONDS:g}s.")
+                return None
+            if process.returncode != 0:
+                logger.error(f"[VideoMediaHandler] ffmpeg falhou ao extrair o áudio: {stderr.decode(errors='ignore').strip()}")
+                return None
+            return audio
+
+        except FileNotFoundError:
+            logger.critical("[VideoMediaHandler] 'ffmpeg' não encontrado no PATH; vídeos não serão transcritos.")
+            return None
+        finally:
+            os.unlink(video_path)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _format_result(self, text: Optional[str], media: dict[str, Any]) -> Optional[str]:
+        if text is None:
+            return None
+        partes = ["[Vídeo enviado]", f"Áudio do vídeo: {text.strip()}"]
+        if media.get('caption'):
+            partes.append(f"Legenda: {media['caption']}")
+        return "\n".join(partes)
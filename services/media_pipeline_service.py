@@ -0,0 +1,108 @@
+from interfaces.clients.queue_interface import IQueue
+from services.media_processor_service import MediaProcessorService
+from services.message_queue_service import MessageQueueService
+from exceptions.media_exceptions import MediaQueueError
+from utils.metrics import metrics
+from utils.logger import logger
+from utils import json_codec
+from typing import Any
+import asyncio
+import time
+import uuid
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+class MediaPipelineService:
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Pipeline de mídia em background: o webhook só reserva o slot da mídia na fila de fragmentos
+    e publica o job no Redis; um pool de workers (em qualquer processo) baixa, decodifica e
+    transcreve, e o resultado volta para o slot reservado.
+    """
+
+    _JOBS_QUEUE_KEY = "media:jobs"
+
+    def __init__(
+        self,
+        media_service: MediaProcessorService,
+        queue_service: MessageQueueService,
+        job_queue: IQueue,
+    ):
+        self.WORKERS = int(os.getenv("MEDIA_PIPELINE_WORKERS", "8"))
+        self.POP_TIMEOUT_SECONDS = 5
+        self.media_service = media_service
+        self.queue_service = queue_service
+        self.job_queue = job_queue
+        self._worker_tasks: list[asyncio.Task] = []
+        logger.info(f"[MediaPipelineService] Inicializado ({self.WORKERS} workers).")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def submit(self, phone: str, media: dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        await self.queue_service.reserve_media_slot(phone, job_id)
+        job = {"job_id": job_id, "phone": phone, "media": media, "enqueued_at": time.time()}
+        if not await self.job_queue.push_to_queue(self._JOBS_QUEUE_KEY, job):
+            # Sem job não há quem resolva o slot: libera o lote do telefone e deixa o webhook falhar (5xx)
+            # para o evento sair do dedup e a Evolution reenviar a mídia.
+            metrics.increment(f"media_pipeline.submit_failed.{media.get('type', 'unknown')}")
+            await self.queue_service.resolve_media_slot(phone, job_id, None, source=media.get('type', 'media'))
+            raise MediaQueueError(f"Falha ao publicar o job de mídia {job_id} na fila '{self._JOBS_QUEUE_KEY}'.")
+        metrics.increment(f"media_pipeline.submitted.{media.get('type', 'unknown')}")
+        logger.info(f"[MediaPipelineService] [{phone}] Job de mídia {job_id} ({media.get('type')}) enfileirado.")
+        return job_id
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def start(self):
+        if self._worker_tasks:
+            return
+        for worker_id in range(self.WORKERS):
+            self._worker_tasks.append(asyncio.create_task(self._worker_loop(worker_id)))
+        if self._worker_tasks:
+            logger.info(f"[MediaPipelineService] {len(self._worker_tasks)} workers de mídia iniciados.")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _worker_loop(self, worker_id: int):
+        while True:
+            try:
+                raw_job = await self.job_queue.blocking_pop(self._JOBS_QUEUE_KEY, self.POP_TIMEOUT_SECONDS)
+                if not raw_job:
+                    continue
+                await self._handle_job(json_codec.loads(raw_job))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[MediaPipelineService] Worker {worker_id}: erro inesperado: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _handle_job(self, job: dict[str, Any]):
+        phone = job["phone"]
+        job_id = job["job_id"]
+        media = job.get("media", {})
+        media_type = media.get("type", "unknown")
+        metrics.observe("media_pipeline.queue_wait_ms", (time.time() - job.get("enqueued_at", time.time())) * 1000)
+        started = time.monotonic()
+        text = None
+        try:
+            text = await self.media_service.process_media(media)
+        except Exception as e:
+            logger.error(f"[MediaPipelineService] [{phone}] Falha no job {job_id}: {e}", exc_info=True)
+        finally:
+            metrics.observe(f"media_pipeline.process_ms.{media_type}", (time.monotonic() - started) * 1000)
+            metrics.increment(f"media_pipeline.{'completed' if text else 'failed'}.{media_type}")
+            await self.queue_service.resolve_media_slot(phone, job_id, text, source=media_type)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def cleanup(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        if self._worker_tasks:
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks.clear()
+        logger.info("[MediaPipelineService] Workers de mídia encerrados.")
\ No newline at end of file
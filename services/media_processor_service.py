@@ -1,20 +1,44 @@
-from clients.openai_client import OpenIAClient
-from interfaces.clients.ia_interface import IAI
+from services.media_handlers.base_media_handler import BaseMediaHandler
+from utils.metrics import metrics
 from utils.logger import logger
-from typing import Any
-from services.crypto.wpp_decoder import Decoder
-import httpx 
+from typing import Any, Optional
 import base64
-import io    
 #--------------------------------------------------------------------------------------------------------------------#
 class MediaProcessorService:
 #--------------------------------------------------------------------------------------------------------------------#
 
-    def __init__(self, ai_client: IAI, decoder: Decoder):
-        self.client = ai_client 
-        self.decodificador = decoder
-        self.http_client = httpx.AsyncClient(timeout=30.0)
-        logger.info("[MediaProcessorService] Inicializado.")
+    _MEDIA_MESSAGE_TYPES: dict[str, str] = {
+        "audioMessage": "audio",
+        "imageMessage": "image",
+        "videoMessage": "video",
+        "documentMessage": "document",
+    }
+
+    def __init__(self, handlers: Optional[list[BaseMediaHandler]] = None):
+        self.handlers: dict[str, BaseMediaHandler] = {}
+        for handler in handlers or []:
+            self.register_handler(handler)
+        logger.info(f"[MediaProcessorService] Inicializado. Mídias suportadas: {sorted(self.handlers)}.")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def register_handler(self, handler: BaseMediaHandler):
+        """Registra (ou substitui) o handler de um tipo de mídia."""
+        self.handlers[handler.media_type] = handler
+        logger.info(f"[MediaProcessorService] Handler '{type(handler).__name__}' registrado para '{handler.media_type}'.")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def is_supported_message(self, message_data: dict[str, Any]) -> bool:
+        """Checagem barata (só chaves do payload) usada pelo pré-filtro do webhook."""
+        if message_data.get('conversation') or message_data.get('extendedTextMessage'):
+            return True
+        if 'documentWithCaptionMessage' in message_data:
+            message_data = message_data['documentWithCaptionMessage'].get('message') or {}
+        return any(
+            message_key in message_data and media_type in self.handlers
+            for message_key, media_type in self._MEDIA_MESSAGE_TYPES.items()
+        )
 
 #--------------------------------------------------------------------------------------------------------------------#
 
@@ -25,39 +49,85 @@ class MediaProcessorService:
             if texto_simples:
                 logger.info("Mensagem identificada como TEXTO.")
                 return texto_simples
-            elif data.get('audioMessage', {}):
-                info_audio = data.get('audioMessage', {})
-                logger.info("Mensagem identificada como ÁUDIO. Iniciando transcrição.")
-                chave_midia_obj = info_audio.get('mediaKey') # <-- Isto é um dict
-                mime_type = info_audio.get('mimetype')
-                url_audio = info_audio.get('url')
-                
-                if not all([url_audio, chave_midia_obj, mime_type]):
-                    logger.error("Payload de áudio incompleto (faltando url, mediaKey ou mimetype).")
-                    return None
-                
-                chave_midia_base64 = None
-                if isinstance(chave_midia_obj, dict):
-                    try:
-                        sorted_keys = sorted(chave_midia_obj.keys(), key=int)
-                        media_key_bytes = bytes([chave_midia_obj[k] for k in sorted_keys])            
-                        chave_midia_base64 = base64.b64encode(media_key_bytes).decode('utf-8')
-                        
-                    except Exception as e:
-                        logger.error(f"Falha ao converter o objeto mediaKey (dict) para Base64: {e}")
-                        return None
-                elif isinstance(chave_midia_obj, str):
-                    chave_midia_base64 = chave_midia_obj
-                else:
-                    logger.error(f"Formato de mediaKey inesperado: {type(chave_midia_obj)}")
-                    return None       
-                return await self.transcricao_audio(url_audio, chave_midia_base64, mime_type)
-            else:            
+            logger.info("Mensagem não é texto simples.")
+            return None
+        except Exception as e:
+            logger.error(f"Erro ao verificar o tipo de mensagem: {e}", exc_info=True)
+            return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def extract_media(self, data: dict[str, Any]) -> dict[str, Any] | None:
+        """Monta o descritor serializável da mídia (processado depois, no pipeline em background)."""
+        try:
+            # Documento com legenda chega embrulhado em 'documentWithCaptionMessage'.
+            if 'documentWithCaptionMessage' in data:
+                data = data['documentWithCaptionMessage'].get('message', {})
+            media_type, info_midia = None, None
+            for message_key, tipo in self._MEDIA_MESSAGE_TYPES.items():
+                if data.get(message_key):
+                    media_type, info_midia = tipo, data[message_key]
+                    break
+            if not info_midia:
                 logger.info("Mensagem não é texto ou mídia suportada.")
                 return None
+            if media_type not in self.handlers:
+                logger.info(f"Mídia do tipo '{media_type}' sem handler registrado. Ignorando.")
+                return None
+            logger.info(f"Mensagem identificada como {media_type.upper()}. Encaminhando para o pipeline de mídia.")
+            chave_midia_obj = info_midia.get('mediaKey') # <-- Isto é um dict
+            mime_type = info_midia.get('mimetype')
+            url_midia = info_midia.get('url')
+            
+            if not all([url_midia, chave_midia_obj, mime_type]):
+                logger.error(f"Payload de {media_type} incompleto (faltando url, mediaKey ou mimetype).")
+                return None
+            
+            chave_midia_base64 = self._bytes_field_to_base64(chave_midia_obj, 'mediaKey')
+            if not chave_midia_base64:
+                return None
+            return {
+                'type': media_type,
+                'url': url_midia,
+                'media_key': chave_midia_base64,
+                'mimetype': mime_type,
+                'file_sha256': self._bytes_field_to_base64(info_midia.get('fileSha256'), 'fileSha256'),
+                'file_length': info_midia.get('fileLength'),
+                'caption': info_midia.get('caption'),
+                'file_name': info_midia.get('fileName'),
+            }
         except Exception as e:
-            logger.error(f"Erro ao verificar o tipo de mensagem: {e}", exc_info=True)
+            logger.error(f"Erro ao extrair descritor de mídia: {e}", exc_info=True)
+            return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @staticmethod
+    def _bytes_field_to_base64(valor: Any, nome_campo: str) -> str | None:
+        """Campos binários do payload (mediaKey, fileSha256) chegam como dict {"0": byte, ...} ou já em Base64."""
+        if valor is None:
+            return None
+        if isinstance(valor, dict):
+            try:
+                sorted_keys = sorted(valor.keys(), key=int)
+                return base64.b64encode(bytes([valor[k] for k in sorted_keys])).decode('utf-8')
+            except Exception as e:
+                logger.error(f"Falha ao converter o objeto {nome_campo} (dict) para Base64: {e}")
+                return None
+        if isinstance(valor, str):
+            return valor
+        logger.error(f"Formato de {nome_campo} inesperado: {type(valor)}")
+        return None
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def process_media(self, media: dict[str, Any]) -> str | None:
+        handler = self.handlers.get(media.get('type'))
+        if not handler:
+            metrics.increment(f"media_handler.unsupported.{media.get('type')}")
+            logger.warning(f"Tipo de mídia não suportado no pipeline: {media.get('type')}")
             return None
+        return await handler.handle(media)
         
 #--------------------------------------------------------------------------------------------------------------------#
     
@@ -80,7 +150,8 @@ class MediaProcessorService:
                 return {"status": "ok", "message": "Payload inválido (sem 'message')."}
 
             input_text = await self.verified_message(message_data)
-            if input_text is None:
+            media = None if input_text is not None else self.extract_media(message_data)
+            if input_text is None and media is None:
                 return {"status": "ok", "message": "Não é uma mensagem de texto/mídia suportada."}
             
             chat_id = key_obj.get('remoteJidAlt', '')
@@ -109,6 +180,8 @@ class MediaProcessorService:
             logger.info(f"ID Telefone: {phone_jid} | ID Auth: {user_auth_id} (Grupo: {group_id})")
             return {
                 'Mensagem': input_text, 
+                'Midia': media,
+                'Tipo': media['type'] if media else 'text',
                 'Numero': phone_jid,  
                 'AuthId': user_auth_id,
                 'GroupId': group_id 
@@ -117,34 +190,3 @@ class MediaProcessorService:
         except Exception as e:
             logger.error(f"Erro crítico ao tratar a mensagem: {e}", exc_info=True)
             return {"status": "error", "message": f"Erro interno: {e}"}
-
-#--------------------------------------------------------------------------------------------------------------------#
-
-    async def transcricao_audio(self, url_audio: str, chave_midia_base64: str, mime_type: str) -> str | None: 
-        try:
-            logger.info(f"Baixando áudio de: {url_audio[:50]}...")
-            response = await self.http_client.get(url_audio)
-            response.raise_for_status()
-            encrypted_bytes = response.content
-            encrypted_buffer = io.BytesIO(encrypted_bytes)
-            logger.info("Áudio criptografado baixado. Descriptografando...")
-            decrypted_buffer = self.decodificador.decodificar_buffer(
-                buffer_criptografado=encrypted_buffer,
-                chave_midia_base64=chave_midia_base64,
-                mime_type=mime_type
-            )
-            logger.info("Áudio descriptografado. Enviando para transcrição...")
-            transcricao = await self.client.transcribe_audio(decrypted_buffer)  
-            logger.info(f"Transcrição concluída: {transcricao[:30]}...")
-            return transcricao
-
-        except httpx.RequestError as e:
-            logger.error(f"Falha ao BAIXAR o áudio: {e}", exc_info=True)
-            return None
-        except ImportError as e:
-            logger.critical(f"ERRO DE DEPENDÊNCIA: {e}. Você instalou 'pycryptodome'? (pip install pycryptodome)")
-            return None
-        except Exception as e:
-            logger.error(f"Falha no pipeline de transcrição: {e}", exc_info=True)
-            return None
-    
\ No newline at end of file
@@ -1,82 +1,351 @@
 from interfaces.repositories.message_fragment_repository_interface import IMessageFragmentRepository
 from interfaces.repositories.context_repository_interface import IContextRepository
 from services.response_orchestrator_service import ResponseOrchestratorService
+from services.turn_scheduler_service import TurnSchedulerService
+from services.context_window_service import ContextWindowService
+from services.debounce_policy import AdaptiveDebouncePolicy
+from utils.metrics import metrics
 from utils.logger import logger
+from typing import Optional
 import asyncio
+import time
+import uuid
+import os
 
 #--------------------------------------------------------------------------------------------------------------------#
 class MessageQueueService:
 #--------------------------------------------------------------------------------------------------------------------#
+    """
+    Debounce distribuído: os fragmentos ficam em `fragments:{phone}` e o deadline de cada
+    telefone em um sorted set no Redis. Qualquer worker pode reivindicar (atomicamente)
+    os lotes expirados, então o serviço pode rodar em vários processos/nós.
+    Cada telefone tem uma "lane" (lock no Redis): só um turno de LLM por conversa por vez.
+    """
+
+    _DEBOUNCE_SCHEDULE_KEY = "debounce:deadlines"
+    _WINDOW_TTL_SECONDS = 7 * 24 * 3600
+    _LANE_TTL_SECONDS = 300
+    _LANE_RETRY_SECONDS = 1.0
+    _MEDIA_PLACEHOLDER_PREFIX = "__media_pending__:"
+    # Folga para a espera na fila do pipeline e o download (com retentativas) antes da extração/transcrição.
+    _MEDIA_SLOT_MARGIN_SECONDS = 120.0
 
     def __init__(
         self,
         orchestrator: ResponseOrchestratorService,
-        context_repository: IContextRepository,       
-        fragment_repository: IMessageFragmentRepository 
+        context_repository: IContextRepository,
+        fragment_repository: IMessageFragmentRepository,
+        turn_scheduler: Optional[TurnSchedulerService] = None,
+        context_window: Optional[ContextWindowService] = None
     ):
-        self.DEBOUNCE_PERIOD_SECONDS = 8.0 
+        self.DEBOUNCE_PERIOD_SECONDS = 8.0
+        self.DEBOUNCE_MODE = os.getenv("DEBOUNCE_MODE", "adaptive").lower()
+        self.POLL_INTERVAL_SECONDS = 0.5
+        # Pior caso de um job de mídia: fila + download + extração do áudio do vídeo + transcrição.
+        # O slot precisa sobreviver a ele, senão a transcrição chega depois como um turno fora de ordem.
+        worst_case_media_seconds = (
+            self._MEDIA_SLOT_MARGIN_SECONDS
+            + float(os.getenv("MEDIA_VIDEO_EXTRACT_TIMEOUT_SECONDS", "120"))
+            + float(os.getenv("WHISPER_JOB_TIMEOUT_SECONDS", "180"))
+        )
+        self.MEDIA_SLOT_TIMEOUT_SECONDS = float(os.getenv("MEDIA_SLOT_TIMEOUT_SECONDS") or worst_case_media_seconds)
+        self.CLAIM_BATCH_SIZE = 50
         self.orchestrator = orchestrator
         self.context_repo = context_repository
         self.fragment_repo = fragment_repository
-        self.active_debounce_timers: dict[str, asyncio.Task] = {}      
+        self.turn_scheduler = turn_scheduler
+        self.context_window = context_window
+        self.debounce_policy = AdaptiveDebouncePolicy()
+        self.active_batches: set[asyncio.Task] = set()
+        self._poller_task: Optional[asyncio.Task] = None
         logger.info(
-            f"[MessageQueueService] MessageQueueService (Debounce) inicializado. "
-            f"[MessageQueueService] Tempo de espera: {self.DEBOUNCE_PERIOD_SECONDS}s."
+            f"[MessageQueueService] MessageQueueService (Debounce distribuído) inicializado. "
+            f"[MessageQueueService] Modo: {self.DEBOUNCE_MODE}. Tempo de espera padrão: {self.DEBOUNCE_PERIOD_SECONDS}s."
         )
 
 #--------------------------------------------------------------------------------------------------------------------#
 
-    async def enqueue_message(self, phone: str, message: str):
-        logger.info(f"[MessageQueueService] [{phone}] Mensagem enfileirada. Resetando timer de {self.DEBOUNCE_PERIOD_SECONDS}s.")
+    async def start(self):
+        if self._poller_task and not self._poller_task.done():
+            return
+        self._poller_task = asyncio.create_task(self._poll_expired_batches())
+        logger.info(f"[MessageQueueService] Poller de deadlines iniciado (intervalo: {self.POLL_INTERVAL_SECONDS}s).")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    def is_adaptive(self) -> bool:
+        return self.DEBOUNCE_MODE == "adaptive"
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def enqueue_message(self, phone: str, message: str, source: str = "text"):
+        now = time.time()
         fragment_key = self._get_fragment_key(phone)
         await self.fragment_repo.add_fragment(fragment_key, message)
-        if phone in self.active_debounce_timers:
-            self.active_debounce_timers[phone].cancel() 
-        self.active_debounce_timers[phone] = asyncio.create_task(self._process_message_batch(phone))
+        await self._record_arrival(phone, now)
+        await self._schedule_debounce(phone, now, message, source)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def reserve_media_slot(self, phone: str, job_id: str):
+        """Reserva a posição da mídia na ordem dos fragmentos; o lote só é drenado quando ela for resolvida."""
+        now = time.time()
+        placeholder = f"{self._MEDIA_PLACEHOLDER_PREFIX}{job_id}:{now!r}"
+        await self.fragment_repo.add_fragment(self._get_fragment_key(phone), placeholder)
+        await self._record_arrival(phone, now)
+        await self._schedule_debounce(phone, now, "", "media")
+        logger.info(f"[MessageQueueService] [{phone}] Slot de mídia {job_id} reservado.")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def resolve_media_slot(self, phone: str, job_id: str, text: Optional[str], source: str = "audio"):
+        fragment_key = self._get_fragment_key(phone)
+        match_prefix = f"{self._MEDIA_PLACEHOLDER_PREFIX}{job_id}:"
+        replaced = await self.fragment_repo.resolve_fragment(fragment_key, match_prefix, text or "")
+        if not replaced and text:
+            logger.warning(f"[MessageQueueService] [{phone}] Slot {job_id} expirou antes da mídia ficar pronta. Anexando ao fim.")
+            await self.fragment_repo.add_fragment(fragment_key, text)
+        logger.info(f"[MessageQueueService] [{phone}] Slot de mídia {job_id} resolvido ({'ok' if text else 'vazio'}).")
+        await self._schedule_debounce(phone, time.time(), text or "", source)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _record_arrival(self, phone: str, timestamp: float):
+        if self.is_adaptive:
+            await self.fragment_repo.add_fragment(self._get_arrivals_key(phone), repr(timestamp))
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _schedule_debounce(self, phone: str, now: float, message: str, source: str):
+        window = await self._get_debounce_window(phone)
+        if self.is_adaptive and self.debounce_policy.looks_complete(message, source):
+            logger.info(f"[MessageQueueService] [{phone}] Fragmento parece completo ({source}). Flush imediato.")
+            window = 0.0
+        logger.info(f"[MessageQueueService] [{phone}] Mensagem enfileirada. Resetando timer de {window}s.")
+        await self.fragment_repo.schedule_flush(self._DEBOUNCE_SCHEDULE_KEY, phone, now + window)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _get_debounce_window(self, phone: str) -> float:
+        if not self.is_adaptive:
+            return self.DEBOUNCE_PERIOD_SECONDS
+        window = await self.fragment_repo.get_flush_window(self._get_window_key(phone))
+        return window if window is not None else self.DEBOUNCE_PERIOD_SECONDS
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _poll_expired_batches(self):
+        while True:
+            try:
+                if self.turn_scheduler and self.turn_scheduler.is_overloaded:
+                    # Backpressure: deixa os lotes vencidos no Redis para workers com folga.
+                    await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
+                    continue
+                due_phones = await self.fragment_repo.claim_due_flushes(
+                    self._DEBOUNCE_SCHEDULE_KEY, time.time(), self.CLAIM_BATCH_SIZE
+                )
+                for phone in due_phones:
+                    task = asyncio.create_task(self._process_message_batch(phone))
+                    self.active_batches.add(task)
+                    task.add_done_callback(self.active_batches.discard)
+                if len(due_phones) >= self.CLAIM_BATCH_SIZE:
+                    continue
+                await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[MessageQueueService] Erro no poller de deadlines: {e}", exc_info=True)
+                await asyncio.sleep(self.POLL_INTERVAL_SECONDS)
 
 #--------------------------------------------------------------------------------------------------------------------#
 
 
     async def _process_message_batch(self, phone: str):
+        lane_key = self._get_lane_key(phone)
+        lane_token = uuid.uuid4().hex
+        if not await self.fragment_repo.acquire_lane(lane_key, lane_token, self._LANE_TTL_SECONDS):
+            logger.info(f"[MessageQueueService] [{phone}] Turno anterior ainda em execução. Fragmentos serão agrupados no próximo turno.")
+            await self.fragment_repo.schedule_flush(
+                self._DEBOUNCE_SCHEDULE_KEY, phone, time.time() + self._LANE_RETRY_SECONDS, keep_existing=True
+            )
+            return
+        heartbeat = asyncio.create_task(self._keep_lane_alive(phone, lane_key, lane_token))
         try:
-            await asyncio.sleep(self.DEBOUNCE_PERIOD_SECONDS)
-            logger.info(f"[MessageQueueService] [{phone}] Timer expirou. Processando lote de mensagens...")
+            logger.info(f"[MessageQueueService] [{phone}] Deadline expirou. Processando lote de mensagens...")
             fragment_key = self._get_fragment_key(phone)
-            fragments = await self.fragment_repo.get_and_clear_fragments(fragment_key)
+            fragments = await self.fragment_repo.get_and_clear_fragments(
+                fragment_key,
+                pending_prefix=self._MEDIA_PLACEHOLDER_PREFIX,
+                stale_before=time.time() - self.MEDIA_SLOT_TIMEOUT_SECONDS,
+            )
+            if fragments is None:
+                logger.info(f"[MessageQueueService] [{phone}] Aguardando mídia pendente antes de montar o lote.")
+                await self.fragment_repo.schedule_flush(
+                    self._DEBOUNCE_SCHEDULE_KEY, phone, time.time() + self._LANE_RETRY_SECONDS, keep_existing=True
+                )
+                return
             if not fragments:
-                logger.warning(f"[MessageQueueService] [{phone}] Timer expirou, mas não há fragmentos. Ignorando.")
+                logger.warning(f"[MessageQueueService] [{phone}] Deadline expirou, mas não há fragmentos. Ignorando.")
                 return
             full_message = " ".join(map(str, fragments))
             logger.info(f"[MessageQueueService] [{phone}] Mensagem completa montada: '{full_message}'")
+            arrivals = await self._drain_arrivals(phone)
             context_data = await self.context_repo.get_context(phone)
             history = context_data.get("history", []) if context_data else []
             history.append({"role": "user", "content": full_message})
-            output_history = await self.orchestrator.execute(history, phone)
-            await self.context_repo.save_context(phone, {"history": output_history})
+            memory = context_data.get("memory") if context_data else None
+            window = self._build_window(history, memory)
+            affinity = context_data.get("active_agent") if context_data else None
+            output_history = await self._run_turn(phone, window, affinity)
+            extra = None
+            if self.is_adaptive and arrivals:
+                extra = {"debounce": await self._learn_debounce_window(
+                    phone, arrivals, context_data.get("debounce") if context_data else None
+                )}
+            new_messages = self._new_turn_messages(window, output_history)
+            await self.context_repo.append_messages(phone, new_messages, extra)
             logger.info(f"[{phone}] Processamento e salvamento de contexto concluídos.")
+            # Ainda dentro do lane: a resposta já foi enviada e nenhum outro turno grava no histórico.
+            await self._compact_context(phone, history[:-1] + new_messages, memory)
 
         except asyncio.CancelledError:
-            logger.info(f"[MessageQueueService] [{phone}] Timer resetado (nova mensagem chegou).")
+            logger.info(f"[MessageQueueService] [{phone}] Processamento do lote cancelado (desligamento).")
         except Exception as e:
             logger.error(f"[MessageQueueService] [{phone}] Erro crítico ao processar lote: {e}", exc_info=True)
         finally:
-            self.active_debounce_timers.pop(phone, None)
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            await self.fragment_repo.release_lane(lane_key, lane_token)
+
+#--------------------------------------------------------------------------------------------------------------------#
 
+    async def _keep_lane_alive(self, phone: str, lane_key: str, lane_token: str):
+        """Renova o TTL do lane enquanto o turno roda; um turno lento não pode deixar o lock expirar."""
+        while True:
+            await asyncio.sleep(self._LANE_TTL_SECONDS / 3)
+            try:
+                if await self.fragment_repo.extend_lane(lane_key, lane_token, self._LANE_TTL_SECONDS):
+                    continue
+                metrics.increment("message_queue.lane_lost")
+                logger.warning(f"[MessageQueueService] [{phone}] Lock do lane perdido durante o turno.")
+                return
+            except Exception as e:
+                logger.error(f"[MessageQueueService] [{phone}] Erro ao renovar o lane: {e}", exc_info=True)
+
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _build_window(self, history: list[dict], memory: Optional[str]) -> list[dict]:
+        if not self.context_window:
+            return history
+        return self.context_window.build_window(history, memory, model=getattr(self.orchestrator, "model", None))
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _compact_context(self, phone: str, stored_history: list[dict], memory: Optional[str]):
+        """Resume na memória os turnos que já não cabem na janela e os remove do documento."""
+        if not self.context_window:
+            return
+        overflow, keep_last = self.context_window.overflow(stored_history, model=getattr(self.orchestrator, "model", None))
+        if not self.context_window.should_summarize(overflow):
+            return
+        logger.info(f"[MessageQueueService] [{phone}] Resumindo {len(overflow)} mensagens antigas na memória da conversa.")
+        if self.turn_scheduler:
+            # O resumo também consome TPM e concorrência do LLM: passa pela mesma fila dos turnos.
+            new_memory = await self.turn_scheduler.submit(
+                phone,
+                lambda: self.context_window.summarize(memory, overflow),
+                estimated_tokens=self.turn_scheduler.estimate_tokens(overflow, passes=1),
+            )
+        else:
+            new_memory = await self.context_window.summarize(memory, overflow)
+        if new_memory:
+            await self.context_repo.compact_history(phone, new_memory, keep_last)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _run_turn(self, phone: str, history: list[dict], affinity: Optional[dict] = None) -> list[dict]:
+        if not self.turn_scheduler:
+            return await self.orchestrator.execute(history, phone, affinity)
+        return await self.turn_scheduler.submit(
+            phone,
+            lambda: self.orchestrator.execute(history, phone, affinity),
+            estimated_tokens=self.turn_scheduler.estimate_tokens(history),
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @staticmethod
+    def _new_turn_messages(history: list[dict], output_history: list[dict]) -> list[dict]:
+        """Mensagens deste turno: a do usuário + o que o agente acrescentou após o histórico de entrada."""
+        input_messages = [msg for msg in history if msg.get("role") != "system"]
+        output_messages = [msg for msg in output_history if msg.get("role") != "system"]
+        if output_messages[:len(input_messages)] == input_messages:
+            added = output_messages[len(input_messages):]
+        else:
+            # Fallbacks de erro devolvem só a resposta, sem o histórico.
+            added = output_messages
+        return history[-1:] + added
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _drain_arrivals(self, phone: str) -> list[float]:
+        if not self.is_adaptive:
+            return []
+        raw_arrivals = await self.fragment_repo.get_and_clear_fragments(self._get_arrivals_key(phone))
+        arrivals = []
+        for raw in raw_arrivals:
+            try:
+                arrivals.append(float(raw))
+            except (TypeError, ValueError):
+                continue
+        return arrivals
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _learn_debounce_window(self, phone: str, arrivals: list[float], stats: Optional[dict]) -> dict:
+        gaps = self.debounce_policy.extract_gaps(arrivals, stats)
+        updated_stats = self.debounce_policy.update_stats(stats, gaps, last_arrival=max(arrivals))
+        await self.fragment_repo.set_flush_window(
+            self._get_window_key(phone), updated_stats["window"], self._WINDOW_TTL_SECONDS
+        )
+        logger.info(f"[MessageQueueService] [{phone}] Janela de debounce aprendida: {updated_stats['window']}s ({updated_stats['samples']} amostras).")
+        return updated_stats
 
 #--------------------------------------------------------------------------------------------------------------------#
 
     def _get_fragment_key(self, phone: str) -> str:
         return f"fragments:{phone}"
 
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _get_arrivals_key(self, phone: str) -> str:
+        return f"debounce:arrivals:{phone}"
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _get_window_key(self, phone: str) -> str:
+        return f"debounce:window:{phone}"
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _get_lane_key(self, phone: str) -> str:
+        return f"lane:{phone}"
+
 #--------------------------------------------------------------------------------------------------------------------#
 
 
     async def cleanup(self):
-        logger.info("[MessageQueueService] Desligando MessageQueueService... Cancelando timers ativos...")
-        tasks = list(self.active_debounce_timers.values())
+        logger.info("[MessageQueueService] Desligando MessageQueueService... Cancelando poller e lotes ativos...")
+        tasks = list(self.active_batches)
+        if self._poller_task:
+            tasks.append(self._poller_task)
         for task in tasks:
             task.cancel()
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
-        self.active_debounce_timers.clear()
-        logger.info("[MessageQueueService] Timers cancelados. Desligamento concluído.")
\ No newline at end of file
+        self.active_batches.clear()
+        self._poller_task = None
+        logger.info("[MessageQueueService] Poller e lotes cancelados. Desligamento concluído.")
\ No newline at end of file
@@ -1,12 +1,23 @@
-from interfaces.clients.chat_interface import IChat 
+from interfaces.clients.chat_interface import IChat
+from utils.metrics import metrics
 from utils.logger import logger
+from typing import AsyncIterator
+import asyncio
+import time
+import re
+import os
 
 #--------------------------------------------------------------------------------------------------------------------#
 class MessageSendService:
 #--------------------------------------------------------------------------------------------------------------------#
 
+    _SENTENCE_END = re.compile(r"[.!?…](\s|$)")
+
     def __init__(self, chat_client: IChat):
         self.chat_client = chat_client
+        self.STREAM_MIN_CHUNK_CHARS = int(os.getenv("REPLY_STREAM_MIN_CHUNK_CHARS", "60"))
+        self.STREAM_MAX_CHUNK_CHARS = int(os.getenv("REPLY_STREAM_MAX_CHUNK_CHARS", "1200"))
+        self._presence_tasks: set[asyncio.Task] = set()
         logger.info("MessageSendService inicializado.")
 
 #--------------------------------------------------------------------------------------------------------------------#
@@ -21,6 +32,62 @@ class MessageSendService:
                 logger.info(f"[MessageSendService] Mensagem enviada para {phone} com sucesso.")
             else:
                 logger.error(f"[MessageSendService] Falha ao enviar mensagem para {phone} (cliente retornou 'false').")
-            
+
         except Exception as e:
-            logger.error(f"Erro ao enviar mensagem para {phone}: {e}", exc_info=True)
\ No newline at end of file
+            logger.error(f"Erro ao enviar mensagem para {phone}: {e}", exc_info=True)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def send_stream(self, phone: str, deltas: AsyncIterator[str]) -> str:
+        """
+        Envia a resposta enquanto ela é gerada: cada parágrafo completo vira uma mensagem no WhatsApp
+        (com 'digitando...' entre elas). Retorna o texto completo efetivamente recebido do modelo.
+        """
+        started = time.monotonic()
+        received: list[str] = []
+        buffer = ""
+        chunks_sent = 0
+        self._show_typing(phone)
+        try:
+            async for delta in deltas:
+                received.append(delta)
+                buffer += delta
+                chunk, buffer = self._take_ready_chunk(buffer)
+                if chunk:
+                    await self.send_message(phone, chunk)
+                    if chunks_sent == 0:
+                        metrics.observe("reply_stream.first_chunk_ms", (time.monotonic() - started) * 1000)
+                    chunks_sent += 1
+                    self._show_typing(phone)
+        finally:
+            # Mesmo se o stream falhar no meio, o que já chegou não se perde.
+            if buffer.strip():
+                await self.send_message(phone, buffer.strip())
+                chunks_sent += 1
+            metrics.observe("reply_stream.chunks", chunks_sent)
+        return "".join(received)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _take_ready_chunk(self, buffer: str) -> tuple[str, str]:
+        """Separa o trecho pronto para envio (até o último fim de parágrafo) do restante ainda em geração."""
+        paragraph_end = buffer.rfind("\n\n")
+        if paragraph_end >= self.STREAM_MIN_CHUNK_CHARS:
+            return buffer[:paragraph_end].strip(), buffer[paragraph_end + 2:]
+        if len(buffer) >= self.STREAM_MAX_CHUNK_CHARS:
+            # Parágrafo longo demais: corta no último fim de frase para não segurar a mensagem.
+            sentence_ends = [match.end() for match in self._SENTENCE_END.finditer(buffer)]
+            cut = sentence_ends[-1] if sentence_ends else len(buffer)
+            return buffer[:cut].strip(), buffer[cut:]
+        return "", buffer
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _show_typing(self, phone: str):
+        send_presence = getattr(self.chat_client, "send_presence", None)
+        if not send_presence:
+            return
+        # Fire-and-forget: a Evolution segura a requisição pelo 'delay' da presença.
+        task = asyncio.create_task(send_presence(phone, "composing"))
+        self._presence_tasks.add(task)
+        task.add_done_callback(self._presence_tasks.discard)
@@ -1,11 +1,19 @@
 from utils.logger import logger
+from utils import json_codec
 from container.agents import AgentContainer
 from interfaces.clients.ia_interface import IAI
 from interfaces.agent.orchestrator_interface import IOrchestrator 
+from interfaces.agent.agent_interface import ReplyStream
+from interfaces.repositories.context_repository_interface import IContextRepository
 from services.message_send_service import MessageSendService 
+from services.intent_router_service import IntentRouterService, RoutingDecision
+from utils.metrics import metrics
 from openai.types.chat import ChatCompletion
-from typing import Optional
-import json
+from collections import OrderedDict
+from typing import Any, Optional
+import hashlib
+import time
+import os
 import re
 
 #--------------------------------------------------------------------------------------------------------------------#
@@ -42,16 +50,29 @@ class ResponseOrchestratorService(IOrchestrator):
         self,
         agent_container: AgentContainer,
         ai_client: IAI, 
-        message_generation_service: MessageSendService
+        message_generation_service: MessageSendService,
+        intent_router: Optional[IntentRouterService] = None,
+        context_repository: Optional[IContextRepository] = None
     ) -> None:
         self.agent_container = agent_container
         self.ai = ai_client
         self.message_generation_service = message_generation_service
+        self.intent_router = intent_router
+        self.context_repo = context_repository
+        self.AFFINITY_TTL_SECONDS = float(os.getenv("AGENT_AFFINITY_TTL_SECONDS", "900"))
+        self.AFFINITY_MAX_REPLY_WORDS = int(os.getenv("AGENT_AFFINITY_MAX_REPLY_WORDS", "8"))
+        self.REPLY_STREAMING = os.getenv("REPLY_STREAMING", "on").lower() != "off"
+        self.ROUTING_MODE = os.getenv("ROUTING_MODE", "compact").lower()
+        self.ROUTING_DIGEST_TURNS = int(os.getenv("ROUTING_DIGEST_TURNS", "6"))
+        self.ROUTING_DIGEST_MESSAGE_CHARS = int(os.getenv("ROUTING_DIGEST_MESSAGE_CHARS", "160"))
+        self.ROUTING_DIGEST_CACHE_SIZE = int(os.getenv("ROUTING_DIGEST_CACHE_SIZE", "5000"))
+        # phone -> (impressão digital das mensagens resumidas, resumo): o resumo só é refeito quando o histórico muda.
+        self._routing_digests: OrderedDict[str, tuple[str, str]] = OrderedDict()
         self.agent_ids = [agent.id for agent in self.agent_container.all()]
         if not self.agent_ids:
             raise ValueError("Nenhum agente foi registrado no AgentContainer.")
         self._routing_tool_definition = self._build_routing_tool(self.agent_ids)
-        logger.info("ResponseOrchestratorService inicializado.")
+        logger.info(f"ResponseOrchestratorService inicializado (roteamento '{self.ROUTING_MODE}').")
 
 #--------------------------------------------------------------------------------------------------------------------#
 
@@ -80,7 +101,7 @@ class ResponseOrchestratorService(IOrchestrator):
 #--------------------------------------------------------------------------------------------------------------------#
 
     def _insert_system_input(self, input_list: list) -> list:
-        if not any(msg.get("role") == "system" for msg in input_list):
+        if not any(msg.get("role") == "system" and msg.get("name") != "memory" for msg in input_list):
             input_list.insert(0, self.system_prompt)
         return input_list
     
@@ -91,7 +112,7 @@ class ResponseOrchestratorService(IOrchestrator):
         try:
             tool_call = response.choices[0].message.tool_calls[0]
             if tool_call.function.name == "route_to_agent":
-                args = json.loads(tool_call.function.arguments)
+                args = json_codec.loads(tool_call.function.arguments)
                 agent_id = args.get("agent_id")
                 
 
@@ -101,7 +122,7 @@ class ResponseOrchestratorService(IOrchestrator):
             logger.warning(f"Chamada de ferramenta inesperada ou ID de agente inválido: {tool_call.function.name}")
             return None
             
-        except (AttributeError, IndexError, TypeError, json.JSONDecodeError):
+        except (AttributeError, IndexError, TypeError, ValueError):
             logger.error("Falha ao extrair agent_id da chamada de ferramenta (tool_call).", exc_info=True)
             return None
 
@@ -109,7 +130,7 @@ class ResponseOrchestratorService(IOrchestrator):
 #--------------------------------------------------------------------------------------------------------------------#
 
     async def _handle_agent(
-        self, phone: str, context: list, agent_id: str
+        self, phone: str, context: list, agent_id: str, reply_stream: Optional[ReplyStream] = None
     ) -> list[dict]:
         agent = self.agent_container.get(agent_id)
         if not agent:
@@ -118,53 +139,270 @@ class ResponseOrchestratorService(IOrchestrator):
         
         logger.info(f"[Orchestrator] Acionando agente: {agent_id}")
         try:
-            agent_output_list = await agent.exec(context=context, phone=phone)
+            agent_output_list = await agent.exec(context=context, phone=phone, reply_stream=reply_stream)
             return agent_output_list
         except Exception as e:
             logger.error(f"Erro ao executar agente '{agent_id}': {e}", exc_info=True)
             return [{"role": "assistant", "content": f"Desculpe, o {agent_id} encontrou um problema."}]
 
 #--------------------------------------------------------------------------------------------------------------------#
-    async def execute(self, context: list, phone: str) -> list[dict]:
+
+    async def execute(self, context: list, phone: str, affinity: Optional[dict[str, Any]] = None) -> list[dict]:
+        user_text = IntentRouterService.last_user_text(context) if self.intent_router else None
+        fast_decision = self.intent_router.route(user_text) if self.intent_router else None
+        sticky_agent_id, sticky_confirmed = self._resolve_affinity(affinity, fast_decision, user_text)
+        streamed_replies: list[str] = []
+        reply_stream = self._make_reply_stream(phone, streamed_replies) if self.REPLY_STREAMING else None
+        if sticky_agent_id and sticky_confirmed:
+            logger.info(f"[Orchestrator] Fluxo aberto com '{sticky_agent_id}'. Roteamento dispensado.")
+            metrics.increment("router.affinity.hit")
+            chosen_agent_id = sticky_agent_id
+            final_history = await self._handle_agent(
+                phone=phone, context=context, agent_id=sticky_agent_id, reply_stream=reply_stream
+            )
+        elif fast_decision and not sticky_agent_id:
+            chosen_agent_id = fast_decision.agent_id
+            final_history = await self._execute_fast_path(phone, context, fast_decision, reply_stream)
+        else:
+            final_history, chosen_agent_id = await self._execute_llm_routing(
+                phone, context, user_text, reply_stream, sticky_agent_id=sticky_agent_id
+            )
+        final_response_message = next(
+            (msg["content"] for msg in reversed(final_history) if msg["role"] == "assistant" and msg.get("content")),
+            None
+        )
+        if streamed_replies:
+            # O histórico guarda o que o usuário de fato recebeu (inclusive um stream interrompido no meio).
+            final_response_message = streamed_replies[-1].strip()
+            final_history = self._replace_final_reply(final_history, final_response_message)
+            logger.info(f"[ResponseOrchetrator] Resposta enviada em streaming: {final_response_message[:50]}...")
+        elif final_response_message:
+            await self.message_generation_service.send_message(phone, final_response_message)
+            logger.info(f"[ResponseOrchetrator] Resposta enviada: {final_response_message[:50]}...")
+        else:
+            logger.error("[Orchestrator] Nenhuma resposta final gerada (nem trivial, nem agente).")
+        await self._update_affinity(phone, affinity, chosen_agent_id, final_history)
+        return final_history
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _resolve_affinity(
+        self, affinity: Optional[dict[str, Any]], fast_decision: Optional[RoutingDecision], user_text: Optional[str]
+    ) -> tuple[Optional[str], bool]:
+        """
+        (agente do fluxo aberto, dispensa o roteador?). Uma decisão local confiante para OUTRO agente encerra o fluxo.
+        Respostas curtas (ex.: "sim", "às 10h") vão direto ao agente; as demais passam pelo roteador LLM, que pode
+        discordar e encerrar a afinidade.
+        """
+        if not affinity or not affinity.get("agent_id"):
+            return None, False
+        agent_id = affinity["agent_id"]
+        if affinity.get("expires_at", 0) < time.time() or agent_id not in self.agent_ids:
+            metrics.increment("router.affinity.expired")
+            return None, False
+        if fast_decision and fast_decision.agent_id:
+            if fast_decision.agent_id != agent_id:
+                logger.info(f"[Orchestrator] Troca de assunto detectada ({agent_id} -> {fast_decision.agent_id}).")
+                metrics.increment("router.affinity.topic_change")
+                return None, False
+            return agent_id, True
+        is_short_reply = len((user_text or "").split()) <= self.AFFINITY_MAX_REPLY_WORDS
+        return agent_id, is_short_reply
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _update_affinity(
+        self, phone: str, affinity: Optional[dict[str, Any]], agent_id: Optional[str], final_history: list[dict]
+    ):
+        """Grava/limpa `active_agent` no documento de contexto, só quando muda (o TTL conta do início do fluxo)."""
+        if not self.context_repo:
+            return
+        agent = self.agent_container.get(agent_id) if agent_id else None
+        flow_open = bool(agent and agent.flow_open(final_history))
+        current_agent_id = affinity.get("agent_id") if affinity and affinity.get("expires_at", 0) >= time.time() else None
+        if flow_open and current_agent_id == agent_id:
+            return
+        if not flow_open and not (affinity and affinity.get("agent_id")):
+            return
+        new_affinity = {"agent_id": agent_id, "expires_at": time.time() + self.AFFINITY_TTL_SECONDS} if flow_open else None
+        try:
+            await self.context_repo.save_context(phone, {"active_agent": new_affinity})
+            logger.info(f"[Orchestrator] [{phone}] Afinidade {'aberta com ' + agent_id if flow_open else 'encerrada'}.")
+        except Exception as e:
+            logger.warning(f"[Orchestrator] [{phone}] Falha ao gravar afinidade de agente: {e}")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @staticmethod
+    def _replace_final_reply(history: list[dict], reply: str) -> list[dict]:
+        for index in range(len(history) - 1, -1, -1):
+            msg = history[index]
+            if msg.get("role") == "assistant" and msg.get("content"):
+                if msg["content"] == reply:
+                    return history
+                return history[:index] + [{**msg, "content": reply}] + history[index + 1:]
+        return history + [{"role": "assistant", "content": reply}]
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _make_reply_stream(self, phone: str, streamed_replies: list[str]) -> ReplyStream:
+        """
+        Callback entregue ao agente: envia os deltas em streaming e registra o texto que já saiu.
+        Se o stream do modelo falhar no meio, os parágrafos recebidos já foram enviados (send_stream): o
+        trecho parcial é registrado antes de propagar o erro, para não mandar uma segunda resposta.
+        """
+        async def reply_stream(deltas) -> str:
+            received: list[str] = []
+
+            async def recording():
+                async for delta in deltas:
+                    received.append(delta)
+                    yield delta
+
+            try:
+                text = await self.message_generation_service.send_stream(phone, recording())
+            except Exception:
+                if "".join(received).strip():
+                    metrics.increment("reply_stream.interrupted")
+                    streamed_replies.append("".join(received))
+                raise
+            streamed_replies.append(text)
+            return text
+        return reply_stream
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _execute_fast_path(
+        self, phone: str, context: list, decision: RoutingDecision, reply_stream: Optional[ReplyStream] = None
+    ) -> list[dict]:
+        if decision.reply:
+            logger.info(f"[Orchestrator] Decisão local ({decision.source}): resposta trivial.")
+            return context + [{"role": "assistant", "content": decision.reply}]
+        logger.info(
+            f"[Orchestrator] Decisão local ({decision.source}, confiança {decision.confidence:.2f}): {decision.agent_id}."
+        )
+        return await self._handle_agent(
+            phone=phone, context=context, agent_id=decision.agent_id, reply_stream=reply_stream
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _execute_llm_routing(
+        self,
+        phone: str,
+        context: list,
+        user_text: Optional[str],
+        reply_stream: Optional[ReplyStream] = None,
+        sticky_agent_id: Optional[str] = None
+    ) -> tuple[list[dict], Optional[str]]:
+        """Roteamento pelo LLM. Com um fluxo aberto (`sticky_agent_id`), só uma escolha de OUTRO agente o encerra."""
+        metrics.increment("router.llm")
         original_context = context.copy()
-        routing_context = self._insert_system_input(original_context)
+        routing_context, mode = self._build_routing_input(phone, original_context)
+        started = time.monotonic()
         response_completion: ChatCompletion = await self.ai.create_model_response(
             model=self.model,
             input_messages=routing_context,
             tools=self.tools,
         )
+        metrics.observe(f"router.latency_ms.{mode}", (time.monotonic() - started) * 1000)
+        if response_completion.usage:
+            metrics.observe(f"router.prompt_tokens.{mode}", response_completion.usage.prompt_tokens)
         response_message = response_completion.choices[0].message 
         final_history = []
-        if response_message.tool_calls:
+        chosen_agent_id = None
+        if sticky_agent_id:
+            routed_agent_id = self._extract_agent_from_tool_call(response_completion) if response_message.tool_calls else None
+            if routed_agent_id and routed_agent_id != sticky_agent_id:
+                logger.info(f"[Orchestrator] Roteador discordou do fluxo aberto ({sticky_agent_id} -> {routed_agent_id}).")
+                metrics.increment("router.affinity.topic_change")
+                await self._record_decision(user_text, routed_agent_id)
+                chosen_agent_id = routed_agent_id
+            else:
+                # Mesmo agente, resposta trivial ou indecisão: a mensagem responde ao passo pendente do fluxo.
+                metrics.increment("router.affinity.confirmed")
+                chosen_agent_id = sticky_agent_id
+            final_history = await self._handle_agent(
+                phone=phone, context=context, agent_id=chosen_agent_id, reply_stream=reply_stream
+            )
+        elif response_message.tool_calls:
             logger.info("[Orchestrator] Decisão: Roteamento para agente.")
             agent_id_to_call = self._extract_agent_from_tool_call(response_completion)
             chosen_agent_id = agent_id_to_call if agent_id_to_call else "agent_mentor"
             
             if not agent_id_to_call:
                  logger.warning(f"Roteamento (tool_call) falhou ou IA não escolheu. Usando 'agent_mentor' como fallback.")
+            else:
+                await self._record_decision(user_text, agent_id_to_call)
             final_history = await self._handle_agent(
                 phone=phone,
                 context=context, 
                 agent_id=chosen_agent_id,
+                reply_stream=reply_stream,
             )
             
         elif response_message.content:
             logger.info(f"[Orchestrator] Decisão: Responder diretamente (Trivial): {response_message.content}")
             final_history = original_context + [{"role": "assistant", "content": response_message.content}]
+            await self._record_decision(user_text, IntentRouterService.TRIVIAL_LABEL)
         else:
             logger.warning("[Orchestrator] Resposta da IA estava vazia (sem tool_call e sem content). Usando 'agent_mentor'.")
             final_history = await self._handle_agent(
                 phone=phone,
                 context=context, 
                 agent_id="agent_mentor",
+                reply_stream=reply_stream,
             )
-        final_response_message = next(
-            (msg["content"] for msg in reversed(final_history) if msg["role"] == "assistant" and msg.get("content")),
-            None
+            chosen_agent_id = "agent_mentor"
+        return final_history, chosen_agent_id
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _build_routing_input(self, phone: str, context: list) -> tuple[list[dict], str]:
+        """
+        'full': histórico inteiro (modo antigo). 'compact': prompt do roteador + resumo curto dos turnos
+        recentes + a mensagem nova, com tamanho limitado independente da duração da conversa.
+        """
+        if self.ROUTING_MODE != "compact" or not context or context[-1].get("role") != "user":
+            return self._insert_system_input(context), "full"
+        routing_input = [self.system_prompt]
+        digest = self._get_routing_digest(phone, context[:-1])
+        if digest:
+            routing_input.append({"role": "system", "content": f"Turnos recentes (resumo, apenas para contexto):\n{digest}"})
+        routing_input.append(context[-1])
+        return routing_input, "compact"
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _get_routing_digest(self, phone: str, previous: list) -> str:
+        speakers = {"user": "usuário", "assistant": "assistente"}
+        recent = [
+            msg for msg in previous
+            if msg.get("role") in speakers and isinstance(msg.get("content"), str) and msg.get("content")
+        ][-self.ROUTING_DIGEST_TURNS:]
+        fingerprint = hashlib.sha1("\x1f".join(msg["content"] for msg in recent).encode("utf-8")).hexdigest()
+        cached = self._routing_digests.get(phone)
+        if cached and cached[0] == fingerprint:
+            self._routing_digests.move_to_end(phone)
+            metrics.increment("router.digest_cache.hit")
+            return cached[1]
+        metrics.increment("router.digest_cache.miss")
+        digest = "\n".join(
+            f"- {speakers[msg['role']]}: {self._clip(msg['content'], self.ROUTING_DIGEST_MESSAGE_CHARS)}" for msg in recent
         )
-        if final_response_message:
-            await self.message_generation_service.send_message(phone, final_response_message)
-            logger.info(f"[ResponseOrchetrator] Resposta enviada: {final_response_message[:50]}...")
-        else:
-            logger.error("[Orchestrator] Nenhuma resposta final gerada (nem trivial, nem agente).")
-        return final_history
\ No newline at end of file
+        self._routing_digests[phone] = (fingerprint, digest)
+        self._routing_digests.move_to_end(phone)
+        while len(self._routing_digests) > self.ROUTING_DIGEST_CACHE_SIZE:
+            self._routing_digests.popitem(last=False)
+        return digest
+
+    @staticmethod
+    def _clip(text: str, max_chars: int) -> str:
+        text = " ".join(text.split())
+        return text if len(text) <= max_chars else text[:max_chars].rstrip() + "…"
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _record_decision(self, user_text: Optional[str], decision: str):
+        if self.intent_router:
+            await self.intent_router.record(user_text, decision)
\ No newline at end of file
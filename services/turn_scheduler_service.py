@@ -0,0 +1,232 @@
+from interfaces.clients.queue_interface import IQueue
+from utils.metrics import metrics
+from utils.logger import logger
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import time
+import os
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+@dataclass
+class _TurnJob:
+    phone: str
+    factory: Callable[[], Awaitable[Any]]
+    estimated_tokens: int
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+#--------------------------------------------------------------------------------------------------------------------#
+class TurnSchedulerService:
+#--------------------------------------------------------------------------------------------------------------------#
+    """
+    Fila justa (round-robin entre telefones) na frente do orquestrador, com limite de turnos
+    simultâneos e orçamento de tokens por minuto (token bucket).
+    O orçamento de TPM fica no Redis e vale para todos os workers; a concorrência é por processo,
+    então LLM_MAX_CONCURRENCY (total da instalação) é dividido por LLM_WORKER_COUNT.
+    """
+
+    _CHARS_PER_TOKEN = 4
+    _TURN_OVERHEAD_TOKENS = 1500
+    _TOKEN_BUCKET_KEY = "llm_scheduler:tpm"
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_queue_depth: Optional[int] = None,
+        token_bucket: Optional[IQueue] = None,
+    ):
+        self.WORKER_COUNT = max(1, int(os.getenv("LLM_WORKER_COUNT", "1")))
+        total_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.MAX_CONCURRENCY = max(1, total_concurrency // self.WORKER_COUNT)
+        self.TOKENS_PER_MINUTE = tokens_per_minute or int(os.getenv("LLM_TOKENS_PER_MINUTE", "400000"))
+        # Sem Redis (ou se ele falhar), cada worker fica com sua fatia do TPM.
+        self.LOCAL_TOKENS_PER_MINUTE = self.TOKENS_PER_MINUTE / self.WORKER_COUNT
+        self.MAX_QUEUE_DEPTH = max_queue_depth or int(os.getenv("LLM_MAX_QUEUE_DEPTH", "100"))
+        self.token_bucket = token_bucket
+        self._queues: dict[str, deque[_TurnJob]] = {}
+        self._ready_phones: deque[str] = deque()
+        self._queued = 0
+        self._running = 0
+        self._tokens_available = float(self.LOCAL_TOKENS_PER_MINUTE)
+        self._last_refill = time.monotonic()
+        self._wakeup = asyncio.Event()
+        self._dispatcher_task: Optional[asyncio.Task] = None
+        self._running_tasks: set[asyncio.Task] = set()
+        logger.info(
+            f"[TurnSchedulerService] Inicializado. Concorrência: {self.MAX_CONCURRENCY} "
+            f"({self.WORKER_COUNT} worker(s)), TPM: {self.TOKENS_PER_MINUTE} "
+            f"({'compartilhado no Redis' if token_bucket else 'local'}), profundidade máx.: {self.MAX_QUEUE_DEPTH}."
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    @property
+    def is_overloaded(self) -> bool:
+        return self._queued >= self.MAX_QUEUE_DEPTH
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def estimate_tokens(self, history: list[dict[str, Any]], passes: int = 2) -> int:
+        chars = sum(len(str(msg.get("content") or "")) for msg in history)
+        # Num turno, roteador + agente leem o histórico, então o custo de prompt conta duas vezes.
+        return passes * (chars // self._CHARS_PER_TOKEN) + self._TURN_OVERHEAD_TOKENS
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def submit(self, phone: str, factory: Callable[[], Awaitable[Any]], estimated_tokens: int) -> Any:
+        if not self._dispatcher_task or self._dispatcher_task.done():
+            self._dispatcher_task = asyncio.create_task(self._dispatch_loop())
+        job = _TurnJob(
+            phone=phone,
+            factory=factory,
+            estimated_tokens=estimated_tokens,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        if phone not in self._queues:
+            self._queues[phone] = deque()
+            self._ready_phones.append(phone)
+        self._queues[phone].append(job)
+        self._queued += 1
+        self._publish_gauges()
+        self._wakeup.set()
+        return await job.future
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _take_tokens(self, estimated_tokens: int) -> float:
+        """Debita o custo do bucket. Retorna 0 se liberado, ou quantos segundos esperar antes de tentar de novo."""
+        if self.token_bucket:
+            result = await self.token_bucket.take_tokens(
+                self._TOKEN_BUCKET_KEY,
+                cost=min(estimated_tokens, self.TOKENS_PER_MINUTE),
+                capacity=self.TOKENS_PER_MINUTE,
+                refill_per_second=self.TOKENS_PER_MINUTE / 60.0,
+            )
+            if result is not None:
+                wait, self._tokens_available = result
+                return wait
+            metrics.increment("llm_scheduler.token_bucket_fallback")
+        cost = min(estimated_tokens, self.LOCAL_TOKENS_PER_MINUTE)
+        self._refill_tokens()
+        if self._tokens_available < cost:
+            return (cost - self._tokens_available) * 60.0 / self.LOCAL_TOKENS_PER_MINUTE
+        self._tokens_available -= cost
+        return 0.0
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _refill_tokens(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens_available = min(
+            self.LOCAL_TOKENS_PER_MINUTE,
+            self._tokens_available + elapsed * self.LOCAL_TOKENS_PER_MINUTE / 60.0,
+        )
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _dispatch_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            retry_in: Optional[float] = None
+            while self._running < self.MAX_CONCURRENCY and self._ready_phones:
+                phone = self._ready_phones[0]
+                job = self._queues[phone][0]
+                if job.future.cancelled():
+                    self._take_job(phone)
+                    continue
+                wait = await self._take_tokens(job.estimated_tokens)
+                if wait > 0:
+                    retry_in = wait
+                    metrics.increment("llm_scheduler.tpm_throttled")
+                    break
+                if job.future.cancelled():
+                    # Cancelado enquanto o bucket respondia; os tokens já debitados voltam com o refill.
+                    self._take_job(phone)
+                    continue
+                self._take_job(phone)
+                self._running += 1
+                task = asyncio.create_task(self._run_job(job))
+                self._running_tasks.add(task)
+                task.add_done_callback(self._running_tasks.discard)
+            self._publish_gauges()
+            if retry_in is not None:
+                asyncio.get_running_loop().call_later(retry_in, self._wakeup.set)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _take_job(self, phone: str) -> _TurnJob:
+        """Remove o próximo job do telefone e o move para o fim da fila round-robin."""
+        queue = self._queues[phone]
+        job = queue.popleft()
+        self._queued -= 1
+        self._ready_phones.popleft()
+        if queue:
+            self._ready_phones.append(phone)
+        else:
+            del self._queues[phone]
+        return job
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def _run_job(self, job: _TurnJob):
+        metrics.observe("llm_scheduler.queue_wait_ms", (time.monotonic() - job.enqueued_at) * 1000)
+        started = time.monotonic()
+        try:
+            result = await job.factory()
+            if not job.future.done():
+                job.future.set_result(result)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            metrics.observe("llm_scheduler.turn_ms", (time.monotonic() - started) * 1000)
+            self._running -= 1
+            self._wakeup.set()
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def _publish_gauges(self):
+        metrics.set_gauge("llm_scheduler.queue_depth", self._queued)
+        metrics.set_gauge("llm_scheduler.running", self._running)
+        metrics.set_gauge("llm_scheduler.phones_waiting", len(self._ready_phones))
+        metrics.set_gauge("llm_scheduler.tokens_available", round(self._tokens_available))
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self._queued,
+            "running": self._running,
+            "phones_waiting": len(self._ready_phones),
+            "tokens_available": round(self._tokens_available),
+            "max_concurrency": self.MAX_CONCURRENCY,
+            "worker_count": self.WORKER_COUNT,
+            "max_queue_depth": self.MAX_QUEUE_DEPTH,
+            "overloaded": self.is_overloaded,
+        }
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    async def cleanup(self):
+        tasks = list(self._running_tasks)
+        if self._dispatcher_task:
+            tasks.append(self._dispatcher_task)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher_task = None
+        logger.info("[TurnSchedulerService] Desligamento concluído.")
\ No newline at end of file
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import timeit
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from utils import json_codec
+
+#--------------------------------------------------------------------------------------------------------------------#
+# Microbenchmark do codec JSON: stdlib vs utils.json_codec nos formatos reais do caminho quente
+# (webhook messages.upsert da Evolution, fragmento no Redis e saída de ferramenta do agente).
+# Uso: python tests/bench_json_codec.py
+#--------------------------------------------------------------------------------------------------------------------#
+
+MEDIA_KEY = {str(i): (i * 37) % 256 for i in range(32)}
+FILE_SHA = {str(i): (i * 91) % 256 for i in range(32)}
+
+TEXT_EVENT = {
+    "event": "messages.upsert",
+    "instance": "zetaone",
+    "data": {
+        "key": {
+            "remoteJid": "5511999998888@s.whatsapp.net",
+            "remoteJidAlt": "120363424101109821@g.us",
+            "participant": "227350148251717@lid",
+            "fromMe": False,
+            "id": "3EB0C767D26A1D8F5A2B",
+        },
+        "pushName": "Maria Eduarda",
+        "status": "DELIVERY_ACK",
+        "message": {
+            "extendedTextMessage": {
+                "text": "Oi! Consegue marcar uma mentoria pra quinta às 15h? Queria revisar o roteiro do vídeo novo.",
+                "contextInfo": {"expiration": 0, "mentionedJid": [], "ephemeralSettingTimestamp": "1719943710"},
+            },
+            "messageContextInfo": {
+                "deviceListMetadata": {"senderKeyHash": "0vYw5xk3Q0mE6w==", "senderTimestamp": "1730000000"},
+                "deviceListMetadataVersion": 2,
+                "messageSecret": "wA2m0k3Yb3hJxZr1qVYk1N0lQ9mM5w0aUuJ0gXb3yYc=",
+            },
+        },
+        "contextInfo": None,
+        "messageType": "extendedTextMessage",
+        "messageTimestamp": 1730000123,
+        "instanceId": "c1f4a1d2-5b6e-4f0a-9d3c-7e8f9a0b1c2d",
+        "source": "android",
+    },
+    "destination": "https://zetaon.example/messages-upsert",
+    "date_time": "2024-10-27T10:15:23.123Z",
+    "sender": "5511988887777@s.whatsapp.net",
+    "server_url": "https://evol.zetaone.online",
+    "apikey": "B6D711FCDE4D4FD5936544120E713976",
+}
+
+AUDIO_EVENT = json.loads(json.dumps(TEXT_EVENT))
+AUDIO_EVENT["data"]["messageType"] = "audioMessage"
+AUDIO_EVENT["data"]["message"] = {
+    "audioMessage": {
+        "url": "https://mmg.whatsapp.net/v/t62.7117-24/12345678_1234567890123456_1234567890123456789_n.enc?ccb=11-4&oh=01_Q5AaIM&oe=6745A1B2&_nc_sid=5e03e0&mms3=true",
+        "mimetype": "audio/ogg; codecs=opus",
+        "fileSha256": FILE_SHA,
+        "fileLength": "23817",
+        "seconds": 14,
+        "ptt": True,
+        "mediaKey": MEDIA_KEY,
+        "fileEncSha256": FILE_SHA,
+        "directPath": "/v/t62.7117-24/12345678_1234567890123456_1234567890123456789_n.enc?ccb=11-4&oh=01_Q5AaIM&oe=6745A1B2&_nc_sid=5e03e0",
+        "mediaKeyTimestamp": "1730000100",
+        "waveform": "AAAAAAAAAAYRFRUcHh4eHh4eHh4ZFRUXFxcXFRUUFA4ODg4ODg4JCQkJCQkJCQkJCQkJ",
+    },
+    "messageContextInfo": TEXT_EVENT["data"]["message"]["messageContextInfo"],
+}
+
+WEBHOOK_RESPONSE = {"status": "received_queued", "detail": "Mensagem de 5511999998888@s.whatsapp.net enfileirada."}
+
+TOOL_OUTPUT = {
+    "status": "sucesso",
+    "eventos": [
+        {
+            "id": f"evt{i}",
+            "summary": f"Mentoria individual #{i}",
+            "start": {"dateTime": f"2024-10-{10 + i}T15:00:00-03:00", "timeZone": "America/Sao_Paulo"},
+            "end": {"dateTime": f"2024-10-{10 + i}T16:00:00-03:00", "timeZone": "America/Sao_Paulo"},
+            "attendees": [{"email": "mentor@zetaone.com", "responseStatus": "accepted"}],
+        }
+        for i in range(8)
+    ],
+}
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+def _stdlib_request(raw: bytes):
+    data = json.loads(raw)
+    json.dumps(WEBHOOK_RESPONSE).encode("utf-8")
+    json.dumps(TOOL_OUTPUT, default=str)
+    return data
+
+
+def _codec_request(raw: bytes):
+    data = json_codec.loads(raw)
+    json_codec.dumpb(WEBHOOK_RESPONSE)
+    json_codec.dumps(TOOL_OUTPUT, default=str)
+    return data
+
+
+def main(iterations: int = 20000):
+    print(f"Backend do codec: {json_codec.BACKEND}")
+    for name, event in (("texto", TEXT_EVENT), ("áudio", AUDIO_EVENT)):
+        raw = json.dumps(event).encode("utf-8")
+        assert _stdlib_request(raw) == _codec_request(raw)
+        stdlib_s = min(timeit.repeat(lambda: _stdlib_request(raw), number=iterations, repeat=5))
+        codec_s = min(timeit.repeat(lambda: _codec_request(raw), number=iterations, repeat=5))
+        stdlib_us = stdlib_s / iterations * 1e6
+        codec_us = codec_s / iterations * 1e6
+        print(
+            f"[{name}] payload {len(raw)} bytes | stdlib {stdlib_us:.1f} µs/req | "
+            f"codec {codec_us:.1f} µs/req | economia {stdlib_us - codec_us:.1f} µs/req ({stdlib_us / codec_us:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
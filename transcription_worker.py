@@ -0,0 +1,84 @@
+from clients.whisper_engine import WhisperEngine, RemoteWhisperEngine
+from clients.redis_client import RedisClient
+from utils.logger import configure_logging, logger
+from utils import json_codec
+from utils.metrics import metrics
+from dotenv import load_dotenv
+from typing import Any
+import asyncio
+import base64
+import time
+
+#--------------------------------------------------------------------------------------------------------------------#
+# Worker dedicado de transcrição (WHISPER_MODE=remote na API): único processo que carrega o Whisper.
+# Uso: python transcription_worker.py
+#--------------------------------------------------------------------------------------------------------------------#
+
+_POP_TIMEOUT_SECONDS = 5
+_RESULT_TTL_SECONDS = 60
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+async def _handle_job(engine: WhisperEngine, queue_client: RedisClient, job: dict[str, Any]):
+    job_id = job.get("job_id")
+    if time.time() > job.get("deadline", float("inf")):
+        # A API já desistiu de esperar por este áudio; não gasta o pool com ele.
+        metrics.increment("transcription_worker.expired")
+        logger.warning(f"[TranscriptionWorker] Job {job_id} expirado antes de ser processado. Descartando.")
+        return
+    try:
+        text = await engine.transcribe(base64.b64decode(job["audio"]))
+        result = {"text": text}
+        metrics.increment("transcription_worker.completed")
+    except Exception as e:
+        logger.error(f"[TranscriptionWorker] Falha no job {job_id}: {e}", exc_info=True)
+        result = {"error": str(e)}
+        metrics.increment("transcription_worker.failed")
+    await queue_client.push_to_queue(job["result_key"], result, ttl_seconds=_RESULT_TTL_SECONDS)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+async def _consumer_loop(consumer_id: int, engine: WhisperEngine, queue_client: RedisClient):
+    while True:
+        try:
+            raw_job = await queue_client.blocking_pop(RemoteWhisperEngine.JOBS_QUEUE_KEY, _POP_TIMEOUT_SECONDS)
+            if not raw_job:
+                continue
+            await _handle_job(engine, queue_client, json_codec.loads(raw_job))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[TranscriptionWorker] Consumidor {consumer_id}: erro inesperado: {e}", exc_info=True)
+            await asyncio.sleep(1)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+async def main():
+    queue_client = RedisClient()
+    engine = WhisperEngine()
+    await engine.warm_up()
+    consumers = [
+        asyncio.create_task(_consumer_loop(consumer_id, engine, queue_client))
+        for consumer_id in range(engine.MAX_CONCURRENCY)
+    ]
+    logger.info(f"[TranscriptionWorker] {len(consumers)} consumidores aguardando jobs em '{RemoteWhisperEngine.JOBS_QUEUE_KEY}'.")
+    try:
+        await asyncio.gather(*consumers)
+    finally:
+        for task in consumers:
+            task.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+        engine.shutdown()
+        await queue_client.close()
+        logger.info("[TranscriptionWorker] Encerrado.")
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+if __name__ == "__main__":
+    load_dotenv()
+    configure_logging()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
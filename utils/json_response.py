@@ -0,0 +1,11 @@
+from fastapi.responses import JSONResponse
+from utils import json_codec
+from typing import Any
+
+#--------------------------------------------------------------------------------------------------------------------#
+class FastJSONResponse(JSONResponse):
+#--------------------------------------------------------------------------------------------------------------------#
+    """JSONResponse serializado pelo codec do projeto (orjson quando disponível)."""
+
+    def render(self, content: Any) -> bytes:
+        return json_codec.dumpb(content)
@@ -0,0 +1,64 @@
+import threading
+from typing import Any
+
+#--------------------------------------------------------------------------------------------------------------------#
+class MetricsRegistry:
+#--------------------------------------------------------------------------------------------------------------------#
+    """Contadores, gauges e distribuições simples em memória (por processo), expostos em GET /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._distributions: dict[str, dict[str, float]] = {}
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            dist = self._distributions.get(name)
+            if dist is None:
+                self._distributions[name] = {"count": 1, "sum": value, "min": value, "max": value}
+                return
+            dist["count"] += 1
+            dist["sum"] += value
+            dist["min"] = min(dist["min"], value)
+            dist["max"] = max(dist["max"], value)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def get_counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            distributions = {
+                name: {**dist, "avg": dist["sum"] / dist["count"]}
+                for name, dist in self._distributions.items()
+            }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "distributions": distributions,
+            }
+
+
+#--------------------------------------------------------------------------------------------------------------------#
+
+
+metrics = MetricsRegistry()
\ No newline at end of file